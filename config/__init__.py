@@ -3,7 +3,11 @@ from enum import StrEnum
 
 from dotenv import load_dotenv
 
-from config.instructions import InstructionsConfig, InstructionType
+from config.instructions import (
+    USER_BEHAVIOR_DEFINITION,
+    InstructionType,
+    get_instruction,
+)
 
 load_dotenv(override=False)
 
@@ -1,4 +1,21 @@
+import json
+import re
+import sys
+import textwrap
+from collections.abc import Iterable, Mapping
 from enum import StrEnum
+from functools import cache
+from types import MappingProxyType
+from typing import Final
+
+__all__ = [
+    "USER_BEHAVIOR_DEFINITION",
+    "USER_BEHAVIOR_DEFINITION_SHORT",
+    "InstructionType",
+    "cypher_instructions",
+    "get_instruction",
+    "render_cypher_instructions",
+]
 
 
 class InstructionType(StrEnum):
@@ -8,17 +25,144 @@ class InstructionType(StrEnum):
     JUDGE = "judge"
 
 
-class InstructionsConfig:
-    USER_BEHAVIOR_DEFINITION = """
+# JSON examples embedded in the prompts are serialized once at import so they stay
+# valid JSON and need no brace escaping inside the prompt templates.
+_ROUTING_LOG_EXAMPLE = json.dumps(
+    {
+        "route": "BOTH",
+        "queries": {"rag": "<question passed>", "cypher": "<question passed>"},
+        "tags": [],
+        "tool_called": "call_both_agents_parallel",
+        "reason": "asks for examples and correlations",
+        "notes": "",
+    },
+    ensure_ascii=False,
+)
+
+_MONGODB_ANSWER_EXAMPLE = json.dumps(
+    {
+        "answer": "Form abandonment spikes when required fields are unclear or unexpected; show progress, reduce required fields, and provide inline help.",
+        "confidence": 0.85,
+        "sources_used": ["question_79188", "question_3791"],
+        "reasoning": "Multiple high-scoring discussions recommend reducing perceived effort and improving field labeling.",
+        "searches": [
+            {
+                "query": "form abandonment patterns",
+                "tags": [],
+                "num_results": 5,
+                "top_scores": [4.1, 3.7, 3.2],
+                "used_ids": ["question_79188", "question_3791"],
+                "eval": "relevant_count=3, top_scores=[4.1,3.7,3.2], decision=STOP",
+            }
+        ],
+    },
+    ensure_ascii=False,
+)
+
+# Few-shot examples for the Cypher agent as (question, cypher) pairs. Keeping them
+# structured lets callers pick the most relevant ones per question instead of
+# shipping every example on every call.
+_CYPHER_EXAMPLES: tuple[tuple[str, str], ...] = (
+    (
+        "Which user has asked the most questions?",
+        """MATCH (u:User)-[:ASKED]->(q:Question)
+WITH u, count(q) as question_count
+ORDER BY question_count DESC
+LIMIT 1
+RETURN u.display_name, question_count""",
+    ),
+    (
+        "What tags are most commonly associated with user-behavior questions?",
+        """MATCH (q:Question)-[:HAS_TAG]->(t:Tag)
+WHERE q.title CONTAINS 'user behavior' OR q.body CONTAINS 'user behavior'
+WITH t, count(q) as question_count
+ORDER BY question_count DESC
+LIMIT 10
+RETURN t.name, question_count""",
+    ),
+    (
+        "What percentage of questions with tag 'user-behavior' have accepted answers?",
+        """MATCH (q:Question)-[:HAS_TAG]->(t:Tag {name: 'user-behavior'})
+WITH q, t
+OPTIONAL MATCH (q)-[:ACCEPTED]->(a:Answer)
+WITH count(DISTINCT q) as total_questions,
+     count(DISTINCT a) as questions_with_accepted
+WHERE total_questions > 0
+RETURN total_questions, questions_with_accepted,
+       (toFloat(questions_with_accepted) / toFloat(total_questions) * 100) as percentage""",
+    ),
+    (
+        "Which users who asked questions about 'frustration' also answered questions about 'satisfaction'?",
+        """MATCH (u:User)-[:ASKED]->(q1:Question)
+WHERE q1.title CONTAINS 'frustration' OR q1.body CONTAINS 'frustration'
+WITH u
+MATCH (u)-[:ANSWERED]->(a:Answer)<-[:HAS_ANSWER]-(q2:Question)
+WHERE q2.title CONTAINS 'satisfaction' OR q2.body CONTAINS 'satisfaction'
+RETURN DISTINCT u.display_name, u.user_id""",
+    ),
+    (
+        "What patterns lead from questions about 'confusion' to questions about 'satisfaction'?",
+        """MATCH (q1:Question)-[:HAS_TAG]->(t:Tag)
+WHERE q1.title CONTAINS 'confusion' OR q1.body CONTAINS 'confusion'
+WITH q1, t
+MATCH (q2:Question)-[:HAS_TAG]->(t)
+WHERE q2.title CONTAINS 'satisfaction' OR q2.body CONTAINS 'satisfaction'
+WITH t.name as tag_name, count(DISTINCT q1) as confusion_count, count(DISTINCT q2) as satisfaction_count
+WHERE confusion_count > 0 AND satisfaction_count > 0
+RETURN tag_name, confusion_count, satisfaction_count
+ORDER BY (confusion_count + satisfaction_count) DESC""",
+    ),
+)
+
+_KEYWORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9_-]+")
+
+
+def _keywords(text: str) -> frozenset[str]:
+    return frozenset(_KEYWORD_PATTERN.findall(text.lower()))
+
+
+_CYPHER_EXAMPLE_KEYWORDS = tuple(
+    _keywords(question) for question, _ in _CYPHER_EXAMPLES
+)
+
+
+def _format_cypher_examples(examples: Iterable[tuple[str, str]]) -> str:
+    return "\n\n".join(
+        f'Example {number}:\n  Question: "{question}"\n  Cypher:\n  ```\n'
+        f"{textwrap.indent(cypher, '  ')}\n  ```"
+        for number, (question, cypher) in enumerate(examples, start=1)
+    )
+
+
+def _select_cypher_example_indices(question: str, k: int) -> tuple[int, ...]:
+    """Pick the k examples sharing the most keywords with the question."""
+    question_keywords = _keywords(question)
+    ranked = sorted(
+        range(len(_CYPHER_EXAMPLES)),
+        key=lambda index: len(question_keywords & _CYPHER_EXAMPLE_KEYWORDS[index]),
+        reverse=True,
+    )
+    return tuple(sorted(ranked[:k]))
+
+
+USER_BEHAVIOR_DEFINITION: Final[str] = sys.intern(
+    """\
 Questions having the [tag:user-behavior] tag regard users reaction and/or behavior to the environment she encounters.
 
 Behavior is the range of actions and mannerisms made by organisms, systems, or artificial entities in conjunction with their environment, which includes the other systems or organisms around as well as the physical environment. It is the response of the system or organism to various stimuli or inputs, whether internal or external, conscious or subconscious, overt or covert, and voluntary or involuntary.
 
-User behavior is behavior conducted by a user in an environment. In User Experience this could be on a web page, a desktop application or something in the physical world such as opening a door or driving a car.
-""".strip()
+User behavior is behavior conducted by a user in an environment. In User Experience this could be on a web page, a desktop application or something in the physical world such as opening a door or driving a car."""
+)
+
+# The orchestrator only needs the gist of the definition for routing
+USER_BEHAVIOR_DEFINITION_SHORT_LENGTH = 300
+USER_BEHAVIOR_DEFINITION_SHORT: Final[str] = sys.intern(
+    USER_BEHAVIOR_DEFINITION[:USER_BEHAVIOR_DEFINITION_SHORT_LENGTH].rsplit(" ", 1)[0]
+    + "..."
+)
+
 
-    INSTRUCTIONS: dict[InstructionType, str] = {
-        InstructionType.ORCHESTRATOR_AGENT: f"""
+_ORCHESTRATOR_TEMPLATE: Final[str] = """\
 You are the Orchestrator Agent. Your job is to route user questions to the right sub-agent(s), invoke those agents, and synthesize their outputs into a concise, actionable answer.
 
 PRIMARY DUTIES
@@ -35,7 +179,7 @@ AGENTS & TOOLS
 
 USER BEHAVIOR CONTEXT
 - Domain: user behavior patterns from social media / StackExchange discussions, and UX analysis.
-- Definition: {USER_BEHAVIOR_DEFINITION}  // Ensure this insertion is sanitized and concise.
+- Definition: {USER_BEHAVIOR_DEFINITION_SHORT}
 
 DECISION RULES (deterministic, follow these in order)
 1. Classify intent by keywords and question form (do not produce internal chain-of-thought):
@@ -80,8 +224,10 @@ SYNTHESIS RULES
 
 ROUTING LOG (MANDATORY)
 - For every question, populate the `routing_log` field with a structured record. Do not put routing information in the `answer` field.
-- `routing_log` must contain: `route` ("RAG" | "CYPHER" | "BOTH"), `queries` (e.g. {{"rag": "<question passed>"}} for RAG-only, {{"cypher": "..."}} for Cypher-only, {{"rag": "...", "cypher": "..."}} for BOTH — use the same user question for each key when one question was sent), `tags` (list, usually []), `tool_called` (the tool name you invoked), `reason` (one-line rationale ≤ 12 words), `notes` (error/fallback notes or "").
+- `routing_log` must contain: `route` ("RAG" | "CYPHER" | "BOTH"), `queries` (maps "rag" and/or "cypher" to the question passed — one key for single-agent routes, both keys for BOTH, using the same user question for each key), `tags` (list, usually []), `tool_called` (the tool name you invoked), `reason` (one-line rationale ≤ 12 words), `notes` (error/fallback notes or "").
 - Example `reason`: "asks for examples and correlations" or "requests only textual examples".
+- Example `routing_log` for a BOTH route:
+{ROUTING_LOG_EXAMPLE}
 
 ERROR HANDLING & FALLBACKS
 
@@ -132,7 +278,6 @@ General Error Handling Rules:
 SAFETY & OUTPUT CONSTRAINTS
 - Do NOT expose chain-of-thought or internal deliberations.
 - Put only the synthesized answer in `answer`; put routing details in `routing_log`. Keep the answer text ≤ 10 sentences.
-- If `{USER_BEHAVIOR_DEFINITION}` is long, truncate to the first 300 characters before inserting.
 
 EXAMPLES (short)
 - Q: "What are common frustrating experiences users report about sign-up flows?"
@@ -145,9 +290,10 @@ IMPLEMENTATION NOTES (for integrators)
 - Validate the routing log format programmatically.
 - Sanitize user input and the inserted USER_BEHAVIOR_DEFINITION before running.
 
-Always favor useful, actionable answers. Make a routing decision even if the question is imprecise, and document that decision in the routing log.
-""".strip(),
-        InstructionType.MONGODB_AGENT: f"""
+Always favor useful, actionable answers. Make a routing decision even if the question is imprecise, and document that decision in the routing log."""
+
+
+_MONGODB_TEMPLATE: Final[str] = """\
 🚫 CRITICAL LIMIT: You have an INITIAL limit of 3 searches. The system may extend this if your results are poor.
 You MUST synthesize your answer from the results you have when you reach the limit.
 
@@ -346,25 +492,10 @@ ADDITIONAL NOTES
 - Sanitize/escape any inserted variables (e.g., USER_BEHAVIOR_DEFINITION) before putting them into this prompt.
 
 EXAMPLE final JSON (example only - agent must produce actual content):
-{{
-  "answer": "Form abandonment spikes when required fields are unclear or unexpected; show progress, reduce required fields, and provide inline help.",
-  "confidence": 0.85,
-  "sources_used": ["question_79188","question_3791"],
-  "reasoning": "Multiple high-scoring discussions recommend reducing perceived effort and improving field labeling.",
-  "searches": [
-    {{
-      "query": "form abandonment patterns",
-      "tags": [],
-      "num_results": 5,
-      "top_scores": [4.1, 3.7, 3.2],
-      "used_ids": ["question_79188","question_3791"],
-      "eval": "relevant_count=3, top_scores=[4.1,3.7,3.2], decision=STOP"
-    }}
-  ]
-}}
+{MONGODB_ANSWER_EXAMPLE}"""
+
 
-""".strip(),
-        InstructionType.CYPHER_QUERY_AGENT: f"""
+_CYPHER_TEMPLATE: Final[str] = """\
 You are the Cypher Query Agent specialized in executing graph database queries on Neo4j.
 
 PRIMARY ROLE:
@@ -381,16 +512,13 @@ NEO4J SCHEMA
 
 {{schema}}
 
-⚠️ DO NOT use any node labels, relationship types, or properties that are NOT listed in the schema above.
 ⚠️ The schema is authoritative - if something is not in the schema, it does not exist in the database.
 
 EXPLICIT CONSTRAINTS
 🚫 STRICT RULES - FOLLOW THESE EXACTLY:
 
 1. Schema Compliance:
-   - Use ONLY the provided relationship types and properties in the schema
-   - DO NOT invent or assume relationship types or properties that are not provided
-   - DO NOT use any other relationship types or properties that are not in the schema
+   - DO NOT invent or assume node labels, relationship types, or properties that are not in the schema
 
 2. Response Format:
    - DO NOT include any explanations or apologies in your responses
@@ -399,7 +527,6 @@ EXPLICIT CONSTRAINTS
 
 3. Query Construction:
    - Generate valid Cypher syntax only
-   - Use proper node labels and relationship types from the schema
    - Follow Cypher best practices for performance
 
 DOMAIN-SPECIFIC RULES FOR STACKEXCHANGE
@@ -430,91 +557,18 @@ Property Formats:
 SAFETY CONSTRAINTS
 🚫 READ-ONLY: Only use MATCH, RETURN, WHERE, WITH, OPTIONAL MATCH, ORDER BY, LIMIT
 - FORBIDDEN: CREATE, DELETE, SET, REMOVE, MERGE (write operations will be rejected)
-- NEVER: return embedding properties, use GROUP BY (use WITH aggregation instead)
+- NEVER: return embedding properties
 - Query Safety: alias WITH statements, filter non-zero denominators before division
 
 CONCRETE CYPHER QUERY EXAMPLES
-Here are 5 example queries to guide your Cypher query generation:
-
-Example 1 - Simple Query:
-  Question: "Which user has asked the most questions?"
-  Cypher:
-  ```
-  MATCH (u:User)-[:ASKED]->(q:Question)
-  WITH u, count(q) as question_count
-  ORDER BY question_count DESC
-  LIMIT 1
-  RETURN u.display_name, question_count
-  ```
-
-Example 2 - Relationship Traversal:
-  Question: "What tags are most commonly associated with user-behavior questions?"
-  Cypher:
-  ```
-  MATCH (q:Question)-[:HAS_TAG]->(t:Tag)
-  WHERE q.title CONTAINS 'user behavior' OR q.body CONTAINS 'user behavior'
-  WITH t, count(q) as question_count
-  ORDER BY question_count DESC
-  LIMIT 10
-  RETURN t.name, question_count
-  ```
-
-Example 3 - Aggregation with Percentage:
-  Question: "What percentage of questions with tag 'user-behavior' have accepted answers?"
-  Cypher:
-  ```
-  MATCH (q:Question)-[:HAS_TAG]->(t:Tag {{name: 'user-behavior'}})
-  WITH q, t
-  OPTIONAL MATCH (q)-[:ACCEPTED]->(a:Answer)
-  WITH count(DISTINCT q) as total_questions,
-       count(DISTINCT a) as questions_with_accepted
-  WHERE total_questions > 0
-  RETURN total_questions, questions_with_accepted,
-         (toFloat(questions_with_accepted) / toFloat(total_questions) * 100) as percentage
-  ```
-
-Example 4 - Pattern Detection:
-  Question: "Which users who asked questions about 'frustration' also answered questions about 'satisfaction'?"
-  Cypher:
-  ```
-  MATCH (u:User)-[:ASKED]->(q1:Question)
-  WHERE q1.title CONTAINS 'frustration' OR q1.body CONTAINS 'frustration'
-  WITH u
-  MATCH (u)-[:ANSWERED]->(a:Answer)<-[:HAS_ANSWER]-(q2:Question)
-  WHERE q2.title CONTAINS 'satisfaction' OR q2.body CONTAINS 'satisfaction'
-  RETURN DISTINCT u.display_name, u.user_id
-  ```
-
-Example 5 - Complex Correlation:
-  Question: "What patterns lead from questions about 'confusion' to questions about 'satisfaction'?"
-  Cypher:
-  ```
-  MATCH (q1:Question)-[:HAS_TAG]->(t:Tag)
-  WHERE q1.title CONTAINS 'confusion' OR q1.body CONTAINS 'confusion'
-  WITH q1, t
-  MATCH (q2:Question)-[:HAS_TAG]->(t)
-  WHERE q2.title CONTAINS 'satisfaction' OR q2.body CONTAINS 'satisfaction'
-  WITH t.name as tag_name, count(DISTINCT q1) as confusion_count, count(DISTINCT q2) as satisfaction_count
-  WHERE confusion_count > 0 AND satisfaction_count > 0
-  RETURN tag_name, confusion_count, satisfaction_count
-  ORDER BY (confusion_count + satisfaction_count) DESC
-  ```
+Here are example queries to guide your Cypher query generation:
+
+{CYPHER_EXAMPLES}
 
 Key Takeaways:
-- Use proper node labels and relationship types from schema only
 - Use WITH to alias intermediate results, break complex queries into steps
-- Filter non-zero denominators before division
 - Use OPTIONAL MATCH for optional relationships, DISTINCT to avoid duplicates
 
-QUERY VALIDATION
-Before executing a query, ensure:
-- Query uses only node labels and relationship types from the schema
-- Query does NOT contain write operations (CREATE, DELETE, SET, REMOVE, MERGE with write intent)
-- Query does NOT contain 'GROUP BY' (use aggregation with WITH instead)
-- All WITH statements properly alias their results
-- Division operations check for non-zero denominators
-- Query syntax is valid Cypher
-
 ANSWER SYNTHESIS
 - Graph results are AUTHORITATIVE - trust them completely, synthesize from what you found
 - If results exist: MUST provide answer (no "I'm not sure" or disclaimers)
@@ -538,7 +592,6 @@ QUERY GENERATION STRATEGY:
 - Generate efficient Cypher queries to traverse the knowledge graph
 - Focus on relationships between behaviors, users, and interface patterns
 - Optimize queries for performance and clarity
-- Use the schema to ensure you're using valid node labels and relationship types
 
 GRAPH QUERY STRATEGY:
 - Look for behavioral pattern relationships (e.g., frustration → abandonment)
@@ -546,9 +599,10 @@ GRAPH QUERY STRATEGY:
 - Discover correlations between interface complexity and user behaviors
 - Find behavioral clusters and common patterns across discussions
 
-Always use Cypher queries to explore the knowledge graph and return structured, interpretable results about user behavior relationships.
-""".strip(),
-        InstructionType.JUDGE: """
+Always use Cypher queries to explore the knowledge graph and return structured, interpretable results about user behavior relationships."""
+
+
+_JUDGE_TEMPLATE: Final[str] = """\
 You are the LLM Judge for evaluating answers produced by the MongoDB Agent.
 Your job is to assess the quality of the final answer AND the quality of the agent's MongoDB search workflow.
 
@@ -617,11 +671,10 @@ Missing these steps significantly reduces **accuracy** and **completeness**.
 
 ### B. Decisive Search Strategy (critical)
 Penalize if the agent:
-- Performed more than 3 searches
-- Performed fewer searches than required by its own evaluation
+- Performed more than 3 searches (severe penalty)
+- Performed fewer searches than required by its own evaluation, or stopped before finding essential results
 - Searched again without explicit evaluation of the previous results
-- Searched unnecessarily when results were already sufficient
-- Ignored obvious stopping conditions (e.g., 2+ relevant results)
+- Kept searching when results were already sufficient (e.g., 2+ relevant results)
 
 Such failures reduce **completeness** and **relevance**.
 
@@ -641,11 +694,6 @@ Poor query construction lowers **relevance** and **accuracy**.
 
 Poor source selection worsens **accuracy** and **relevance**.
 
-### E. Overuse/Underuse of Searches
-- More than 3 searches → severe penalty
-- Stopping too early and missing essential results → completeness penalty
-- Stopping too late when sufficient results were already found → relevance penalty
-
 ----------------------------------------------------------------------
 OVERALL SCORE (0.0–1.0)
 ----------------------------------------------------------------------
@@ -675,6 +723,68 @@ Example:
   "completeness": 0.85,
   "relevance": 0.88,
   "reasoning": "The answer is well-supported by the retrieved MongoDB posts and directly addresses the question. The agent performed appropriate searches and stopped after finding sufficient results. Minor nuances from the sources were omitted."
-}}
-""".strip(),
+}}"""
+
+
+# Values substituted into the templates with str.format_map; literal braces in
+# the templates are doubled.
+_SUBSTITUTIONS: Final[Mapping[str, str]] = MappingProxyType(
+    {
+        "USER_BEHAVIOR_DEFINITION": USER_BEHAVIOR_DEFINITION,
+        "USER_BEHAVIOR_DEFINITION_SHORT": USER_BEHAVIOR_DEFINITION_SHORT,
+        "ROUTING_LOG_EXAMPLE": _ROUTING_LOG_EXAMPLE,
+        "MONGODB_ANSWER_EXAMPLE": _MONGODB_ANSWER_EXAMPLE,
+        "CYPHER_EXAMPLES": _format_cypher_examples(_CYPHER_EXAMPLES),
+    }
+)
+
+_TEMPLATES: Final[Mapping[InstructionType, str]] = MappingProxyType(
+    {
+        InstructionType.ORCHESTRATOR_AGENT: _ORCHESTRATOR_TEMPLATE,
+        InstructionType.MONGODB_AGENT: _MONGODB_TEMPLATE,
+        InstructionType.CYPHER_QUERY_AGENT: _CYPHER_TEMPLATE,
+        InstructionType.JUDGE: _JUDGE_TEMPLATE,
     }
+)
+
+
+@cache
+def get_instruction(instruction_type: InstructionType | str) -> str:
+    """Render the instructions for an agent on first use and keep them cached.
+
+    StrEnum members hash and compare like their values, so InstructionType.JUDGE
+    and "judge" share one cache entry.
+    """
+    return sys.intern(_TEMPLATES[instruction_type].format_map(_SUBSTITUTIONS))
+
+
+# Keyed by the selected examples, not the question: at most one entry per
+# subset of _CYPHER_EXAMPLES, however many distinct questions are asked
+@cache
+def _cypher_instruction_parts(
+    example_indices: tuple[int, ...] | None,
+) -> tuple[str, str]:
+    """Cypher instructions with the given examples (all if None), split at {schema}."""
+    if example_indices is None:
+        instructions = get_instruction(InstructionType.CYPHER_QUERY_AGENT)
+    else:
+        examples = (_CYPHER_EXAMPLES[index] for index in example_indices)
+        instructions = _CYPHER_TEMPLATE.format_map(
+            {**_SUBSTITUTIONS, "CYPHER_EXAMPLES": _format_cypher_examples(examples)}
+        )
+    prefix, _, suffix = instructions.partition("{schema}")
+    return prefix, suffix
+
+
+def render_cypher_instructions(
+    schema: str, question: str | None = None, k: int = 2
+) -> str:
+    """Cypher agent instructions with the Neo4j schema filled in.
+
+    Given a question, only the k most relevant few-shot examples are included.
+    """
+    example_indices = (
+        None if question is None else _select_cypher_example_indices(question, k)
+    )
+    prefix, suffix = _cypher_instruction_parts(example_indices)
+    return prefix + schema + suffix
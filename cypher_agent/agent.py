@@ -1,14 +1,15 @@
-import json
 import logging
 import re
+import sys
+from functools import cache
 from typing import Any
 
-from pydantic_ai import Agent, ModelSettings
+from pydantic_ai import Agent, ModelSettings, RunContext, Tool
 from pydantic_ai.messages import FunctionToolCallEvent
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic_ai.providers.openai import OpenAIProvider
 
-from config.instructions import InstructionsConfig, InstructionType
+from config.instructions import render_cypher_instructions
 from cypher_agent.config import (
     MAX_RESET_ATTEMPTS,
     QUERY_DISPLAY_TRUNCATE_LENGTH,
@@ -34,6 +35,30 @@ from monitoring.agent_logging import log_agent_run_async
 
 logger = logging.getLogger(__name__)
 
+# Valid source identifiers: "question_<id>" or "node_<id>"
+_SOURCE_ID_PATTERN = re.compile(r"^(?:question|node)_\d+$")
+
+# Query value at the start of raw JSON tool args, found without parsing the payload
+_QUERY_PREVIEW_PATTERN = re.compile(
+    rf'"query"\s*:\s*"([^"]{{0,{QUERY_DISPLAY_TRUNCATE_LENGTH}}})'
+)
+_QUERY_PREVIEW_SCAN_LENGTH = 256
+
+# Tool schema is introspected once here instead of on every Agent construction
+_EXECUTE_CYPHER_QUERY_TOOL = Tool(execute_cypher_query)
+
+
+@cache
+def _is_event_stream(event_type: type) -> bool:
+    """Whether events of this type are nested async streams (checked once per type)."""
+    return hasattr(event_type, "__aiter__")
+
+
+@cache
+def _openai_model(model_name: str) -> OpenAIChatModel:
+    """One model (and provider HTTP client) per model name, shared by all agents."""
+    return OpenAIChatModel(model_name=model_name, provider=OpenAIProvider())
+
 
 class CypherQueryAgent:
     def __init__(self, config: CypherAgentConfig):
@@ -41,6 +66,7 @@ class CypherQueryAgent:
         self.agent = None
         self.driver = None
         self.schema = None
+        self._agent_key = None
 
     def initialize(self) -> None:
         logger.info("Connecting to Neo4j...")
@@ -51,56 +77,64 @@ class CypherQueryAgent:
         )
 
         set_max_tool_calls(self.config.max_tool_calls)
-        logger.info(f"Tool call limit set to {self.config.max_tool_calls}")
+        logger.info("Tool call limit set to %d", self.config.max_tool_calls)
 
         set_max_query_results(self.config.max_query_results)
-        logger.info(f"Query result limit set to {self.config.max_query_results}")
+        logger.info("Query result limit set to %d", self.config.max_query_results)
 
         set_max_tool_result_size(self.config.max_tool_result_size)
         logger.info(
-            f"Tool result size limit set to {self.config.max_tool_result_size} chars"
+            "Tool result size limit set to %d chars", self.config.max_tool_result_size
         )
 
-        # Get schema and cache it
+        # get_neo4j_schema caches the schema with a TTL and does not cache the
+        # fallback, so re-initializing picks up a recovered or changed schema
         logger.info("Retrieving Neo4j schema...")
         self.schema = self._get_schema()
         logger.info("Neo4j schema retrieved successfully")
 
-        base_instructions = InstructionsConfig.INSTRUCTIONS[
-            InstructionType.CYPHER_QUERY_AGENT
-        ]
-        instructions = self._inject_schema_into_instructions(
-            base_instructions, self.schema
+        if self.config.max_cypher_examples is None:
+            instructions = render_cypher_instructions(self.schema)
+        else:
+            # Pick the few-shot examples per question at run time
+            instructions = self._instructions_for_question
+
+        # Rebuilding the Agent is only needed when what it was built from changed;
+        # per-question instructions read the schema at run time, so key on it too
+        agent_key = (
+            self.config.openai_model,
+            self.config.max_tokens,
+            self.schema,
+            instructions,
         )
+        if self.agent is not None and agent_key == self._agent_key:
+            logger.info("Cypher Query Agent already initialized, reusing agent")
+            return
 
-        model = OpenAIChatModel(
-            model_name=self.config.openai_model,
-            provider=OpenAIProvider(),
-        )
-        logger.info(f"Using OpenAI model: {self.config.openai_model}")
+        model = _openai_model(self.config.openai_model)
+        logger.info("Using OpenAI model: %s", self.config.openai_model)
 
         self.agent = Agent(
             name="cypher_query_agent",
             model=model,
-            tools=[execute_cypher_query],
+            tools=[_EXECUTE_CYPHER_QUERY_TOOL],
             instructions=instructions,
             output_type=CypherAnswer,
             model_settings=ModelSettings(max_tokens=self.config.max_tokens),
         )
+        self._agent_key = agent_key
 
         logger.info("Cypher Query Agent initialized successfully")
 
     def _get_schema(self) -> str:
+        # get_neo4j_schema caches the formatted schema across agents for a TTL
         return get_neo4j_schema(max_size=self.config.max_schema_size)
 
-    def _inject_schema_into_instructions(self, instructions: str, schema: str) -> str:
-        if "{schema}" in instructions:
-            return instructions.replace("{schema}", schema)
-        else:
-            logger.warning(
-                "No {schema} placeholder found in instructions. Appending schema."
-            )
-            return instructions + f"\n\n{schema}"
+    def _instructions_for_question(self, ctx: RunContext[None]) -> str:
+        question = ctx.prompt if isinstance(ctx.prompt, str) else ""
+        return render_cypher_instructions(
+            self.schema, question, self.config.max_cypher_examples
+        )
 
     def _reset_and_verify_counters(self) -> None:
         """Reset tool calls and counter, verify counter is properly reset."""
@@ -109,8 +143,9 @@ class CypherQueryAgent:
         initial_count = get_tool_call_count()
         if initial_count != 0:
             logger.error(
-                f"CRITICAL: Counter not properly reset! Expected 0, got {initial_count}. "
-                f"Attempting reset again..."
+                "CRITICAL: Counter not properly reset! Expected 0, got %d. "
+                "Attempting reset again...",
+                initial_count,
             )
             reset_tool_call_count()
             initial_count = get_tool_call_count()
@@ -124,66 +159,64 @@ class CypherQueryAgent:
 
     def _extract_token_usage(self, result: Any) -> TokenUsage:
         """Extract token usage from result, with fallback to zero if unavailable."""
-        if result is None:
+        usage_fn = getattr(result, "usage", None)
+        if usage_fn is None:
             return TokenUsage(input_tokens=0, output_tokens=0, total_tokens=0)
 
         try:
-            usage_obj = result.usage()
-            return TokenUsage(
-                input_tokens=usage_obj.input_tokens,
-                output_tokens=usage_obj.output_tokens,
-                total_tokens=usage_obj.input_tokens + usage_obj.output_tokens,
-            )
-        except (AttributeError, Exception) as usage_error:
+            usage_obj = usage_fn()
+            input_tokens = usage_obj.input_tokens
+            output_tokens = usage_obj.output_tokens
+            total_tokens = input_tokens + output_tokens
+        except (AttributeError, TypeError) as usage_error:
             logger.warning(
-                f"Could not extract token usage from result: {usage_error}. "
-                f"Using fallback token usage."
+                "Could not extract token usage from result: %s. "
+                "Using fallback token usage.",
+                usage_error,
             )
             return TokenUsage(input_tokens=0, output_tokens=0, total_tokens=0)
 
+        return TokenUsage(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=total_tokens,
+        )
+
     def _filter_valid_sources(self, sources: list[str]) -> list[str]:
         """Filter sources to only include valid node/question identifiers."""
-        question_pattern = re.compile(r"^question_\d+$")
-        node_pattern = re.compile(r"^node_\d+$")
-
-        valid_sources = []
-        for source in sources:
-            if isinstance(source, str):
-                if question_pattern.match(source) or node_pattern.match(source):
-                    valid_sources.append(source)
-                else:
-                    logger.debug(
-                        f"Filtered out invalid source: {source} (not a valid node/question ID)"
-                    )
-
-        return valid_sources
+        # Callers log one summary of what was filtered out
+        # IDs repeat across answers; interning keeps one copy of each
+        return [
+            sys.intern(source)
+            for source in sources
+            if isinstance(source, str) and _SOURCE_ID_PATTERN.match(source)
+        ]
 
     def _extract_sources_from_result(self, result: Any) -> list[str]:
         """Extract source node IDs from result output if available."""
-        if result is None:
+        # A validated CypherAnswer always carries a list of strings
+        output = getattr(result, "output", None)
+        if not isinstance(output, CypherAnswer) or not output.sources_used:
             return []
 
-        try:
-            output = result.output
-            if isinstance(output, CypherAnswer) and output.sources_used:
-                raw_sources = output.sources_used
-                # Filter to only valid node/question IDs
-                valid_sources = self._filter_valid_sources(raw_sources)
-
-                if len(valid_sources) < len(raw_sources):
-                    logger.warning(
-                        f"Filtered {len(raw_sources) - len(valid_sources)} invalid sources. "
-                        f"Original: {raw_sources}, Filtered: {valid_sources}"
-                    )
+        raw_sources = output.sources_used
+        # Filter to only valid node/question IDs
+        valid_sources = self._filter_valid_sources(raw_sources)
 
-                logger.info(
-                    f"Extracted {len(valid_sources)} valid sources from {len(raw_sources)} total"
-                )
-                return valid_sources
-        except (AttributeError, Exception) as source_error:
-            logger.debug(f"Could not extract sources from result: {source_error}.")
+        if len(valid_sources) < len(raw_sources):
+            logger.warning(
+                "Filtered %d invalid sources. Original: %s, Filtered: %s",
+                len(raw_sources) - len(valid_sources),
+                raw_sources,
+                valid_sources,
+            )
 
-        return []
+        logger.info(
+            "Extracted %d valid sources from %d total",
+            len(valid_sources),
+            len(raw_sources),
+        )
+        return valid_sources
 
     async def query(self, question: str) -> CypherAgentResult:
         self._reset_and_verify_counters()
@@ -192,55 +225,54 @@ class CypherQueryAgent:
             raise RuntimeError("Agent not initialized. Call initialize() first.")
 
         logger.info(
-            f"Running Cypher Query Agent query: {question[:QUESTION_LOG_TRUNCATE_LENGTH]}..."
+            "Running Cypher Query Agent query: %s...",
+            question[:QUESTION_LOG_TRUNCATE_LENGTH],
         )
         print(
             "🤖 Cypher Query Agent is processing your question (this may take 30-60 seconds)..."
         )
 
         tool_calls: list[dict] = []
+        verbose = self.config.verbose
 
         async def track_tool_calls(ctx: Any, event: Any) -> None:
             """Event handler to track all tool calls (per-run, concurrency-safe)."""
-            # Handle nested async streams
-            if hasattr(event, "__aiter__"):
-                async for sub in event:
-                    await track_tool_calls(ctx, sub)
+            event_type = type(event)
+            if event_type is not FunctionToolCallEvent:
+                # Handle nested async streams
+                if _is_event_stream(event_type):
+                    async for sub in event:
+                        await track_tool_calls(ctx, sub)
                 return
 
-            if not isinstance(event, FunctionToolCallEvent):
-                return
-
-            tool_call = {"tool_name": event.part.tool_name, "args": event.part.args}
+            part = event.part
+            tool_call = {"tool_name": sys.intern(part.tool_name), "args": part.args}
             tool_calls.append(tool_call)
             tool_num = len(tool_calls)
 
-            # Parse args to extract query for display
-            try:
-                args_dict = (
-                    json.loads(event.part.args)
-                    if isinstance(event.part.args, str)
-                    else event.part.args
-                )
-                query = (
-                    args_dict.get("query", "N/A")[:QUERY_DISPLAY_TRUNCATE_LENGTH]
-                    if isinstance(args_dict, dict)
-                    else str(event.part.args)[:QUERY_DISPLAY_TRUNCATE_LENGTH]
+            if verbose:
+                # Short preview of the query for display; raw JSON args are not parsed
+                args = part.args
+                if isinstance(args, dict):
+                    args = args.get("query", "N/A")
+                elif isinstance(args, str):
+                    match = _QUERY_PREVIEW_PATTERN.search(
+                        args, 0, _QUERY_PREVIEW_SCAN_LENGTH
+                    )
+                    if match:
+                        args = match.group(1)
+                query = str(args)[:QUERY_DISPLAY_TRUNCATE_LENGTH] if args else "N/A"
+                print(
+                    f"🔍 Tool call #{tool_num}: {part.tool_name} with query: {query}..."
                 )
-            except (json.JSONDecodeError, AttributeError, TypeError):
-                query = (
-                    str(event.part.args)[:QUERY_DISPLAY_TRUNCATE_LENGTH]
-                    if event.part.args
-                    else "N/A"
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Tool Call #%d: %s with args: %s",
+                    tool_num,
+                    part.tool_name,
+                    part.args,
                 )
 
-            print(
-                f"🔍 Tool call #{tool_num}: {event.part.tool_name} with query: {query}..."
-            )
-            logger.info(
-                f"Tool Call #{tool_num}: {event.part.tool_name} with args: {event.part.args}"
-            )
-
         # Run agent with event tracking
         result = None
         try:
@@ -250,7 +282,7 @@ class CypherQueryAgent:
             )
             token_usage = self._extract_token_usage(result)
 
-            logger.info(f"Agent completed query. Tool calls: {len(tool_calls)}")
+            logger.info("Agent completed query. Tool calls: %d", len(tool_calls))
             print(
                 f"✅ Cypher Query Agent completed query. Made {len(tool_calls)} tool calls."
             )
@@ -258,7 +290,7 @@ class CypherQueryAgent:
             try:
                 log_agent_run_async(self.agent, result, question)
             except Exception as e:
-                logger.warning(f"Failed to start background logging task: {e}")
+                logger.warning("Failed to start background logging task: %s", e)
 
             # Filter sources to only include valid node/question IDs
             answer = result.output
@@ -266,8 +298,10 @@ class CypherQueryAgent:
                 filtered_sources = self._filter_valid_sources(answer.sources_used)
                 if len(filtered_sources) < len(answer.sources_used):
                     logger.warning(
-                        f"Filtered {len(answer.sources_used) - len(filtered_sources)} invalid sources. "
-                        f"Original: {answer.sources_used}, Filtered: {filtered_sources}"
+                        "Filtered %d invalid sources. Original: %s, Filtered: %s",
+                        len(answer.sources_used) - len(filtered_sources),
+                        answer.sources_used,
+                        filtered_sources,
                     )
                     answer = CypherAnswer(
                         answer=answer.answer,
@@ -279,10 +313,10 @@ class CypherQueryAgent:
 
             return CypherAgentResult(
                 answer=answer,
-                tool_calls=tool_calls.copy(),
+                tool_calls=tool_calls,
                 token_usage=token_usage,
             )
 
         except Exception as e:
-            logger.error(f"Error during Cypher Query Agent execution: {e}")
+            logger.error("Error during Cypher Query Agent execution: %s", e)
             raise
@@ -14,7 +14,7 @@ QUESTION_LOG_TRUNCATE_LENGTH = 100
 MAX_RESET_ATTEMPTS = 2
 
 
-@dataclass
+@dataclass(slots=True)
 class CypherAgentConfig:
     openai_model: str = OPENAI_RAG_MODEL
     instruction_type: InstructionType = InstructionType.CYPHER_QUERY_AGENT
@@ -26,3 +26,6 @@ class CypherAgentConfig:
     max_schema_size: int = 5000
     max_query_results: int = 100
     max_tool_result_size: int = 50000  # Maximum size of tool call result in characters (prevents token overflow)
+    # Few-shot examples per call, picked by keyword overlap (None ships all of them)
+    max_cypher_examples: int | None = None
+    verbose: bool = True  # Print per-tool-call progress to stdout
@@ -2,11 +2,17 @@ import json
 import logging
 import re
 import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Iterator
+from functools import lru_cache, partial
+from itertools import chain
 from typing import Any
 
 import neo4j
 from neo4j import GraphDatabase
 from neo4j.exceptions import CypherSyntaxError, ServiceUnavailable
+from neo4j.graph import Node, Relationship
 
 from mongodb_agent.tools import ToolCallLimitExceeded
 
@@ -27,6 +33,17 @@ _counter_lock = threading.Lock()
 _max_query_results = 100
 _max_tool_result_size = 50000
 
+NEO4J_DATABASE = "neo4j"
+# execute_query retries transient errors for up to 30 s by default; a tool call
+# should fail fast and let the agent react, as a plain session.run did
+NEO4J_MAX_TRANSACTION_RETRY_TIME = 0.0
+SCHEMA_CACHE_TTL_SECONDS = 300.0
+# Formatted schemas: (database, max_size) -> (fetched_at, schema)
+_schema_cache: dict[tuple[str, int | None], tuple[float, str]] = {}
+_schema_lock = threading.Lock()
+# Held while querying Neo4j so concurrent cache misses trigger a single fetch
+_schema_fetch_lock = threading.Lock()
+
 
 def set_max_tool_calls(max_calls: int) -> None:
     global _initial_max_tool_calls, _current_max_tool_calls
@@ -68,19 +85,24 @@ def _check_and_increment_tool_call_count() -> int:
     """Check limit before incrementing, raise exception if limit reached."""
     global _tool_call_count, _current_max_tool_calls
 
+    # Only the compare-and-increment holds the lock; logging happens after release
     with _counter_lock:
-        if _tool_call_count >= _current_max_tool_calls:
-            logger.warning(
-                f"Tool call limit reached: {_tool_call_count} >= {_current_max_tool_calls}. "
-                f"Blocking call before it starts."
-            )
-            raise ToolCallLimitExceeded(_tool_call_count, _current_max_tool_calls)
-
-        _tool_call_count += 1
-        logger.info(
-            f"✅ Tool call #{_tool_call_count} of {_current_max_tool_calls} allowed"
+        count = _tool_call_count
+        max_calls = _current_max_tool_calls
+        allowed = count < max_calls
+        if allowed:
+            count += 1
+            _tool_call_count = count
+
+    if not allowed:
+        logger.warning(
+            f"Tool call limit reached: {count} >= {max_calls}. "
+            f"Blocking call before it starts."
         )
-        return _tool_call_count
+        raise ToolCallLimitExceeded(count, max_calls)
+
+    logger.info(f"✅ Tool call #{count} of {max_calls} allowed")
+    return count
 
 
 FORBIDDEN_KEYWORDS = ["CREATE", "DELETE", "SET", "REMOVE", "MERGE"]
@@ -91,6 +113,68 @@ FORBIDDEN_PATTERNS = [
     r"\bREMOVE\b",
     r"\bMERGE\b",
 ]
+# Single pass over the query for all forbidden keywords; case-insensitive so the
+# query is never copied with upper()
+_FORBIDDEN_KEYWORD_PATTERN = re.compile(
+    rf"\b({'|'.join(FORBIDDEN_KEYWORDS)})\b", re.IGNORECASE
+)
+_GROUP_BY_PATTERN = re.compile(r"\bGROUP\s+BY\b", re.IGNORECASE)
+# A GROUP BY clause that only lists grouping keys (captured)
+_GROUP_BY_KEYS_PATTERN = re.compile(
+    r"\s*GROUP\s+BY\s+([\w.]+(?:\s*,\s*[\w.]+)*)\s*", re.IGNORECASE
+)
+# Start of the RETURN/WITH projection a GROUP BY follows, and where it ends
+_PROJECTION_PATTERN = re.compile(
+    r"\b(?:RETURN|WITH)\b(?:\s+DISTINCT\b)?", re.IGNORECASE
+)
+_PROJECTION_END_PATTERN = re.compile(
+    r"\b(?:ORDER\s+BY|SKIP|LIMIT|WHERE)\b", re.IGNORECASE
+)
+_AGGREGATE_CALL_PATTERN = re.compile(
+    r"\b(?:count|sum|avg|min|max|collect|stDevP?|percentileCont|percentileDisc)\s*\(",
+    re.IGNORECASE,
+)
+_PROJECTION_ALIAS_PATTERN = re.compile(r"(.*?)\s+AS\s+(\w+)", re.IGNORECASE | re.DOTALL)
+# String literals, quoted identifiers and comments, blanked out before validation
+_LITERAL_OR_COMMENT_PATTERN = re.compile(
+    r"'(?:[^'\\]|\\.)*'"
+    r'|"(?:[^"\\]|\\.)*"'
+    r"|`[^`]*`"
+    r"|//[^\n]*"
+    r"|/\*.*?\*/",
+    re.DOTALL,
+)
+# SQL-style GROUP BY clause, up to the next Cypher clause or the end of the query
+_GROUP_BY_CLAUSE_PATTERN = re.compile(
+    r"\s*\bGROUP\s+BY\b.*?"
+    r"(?=\s*\b(?:ORDER\s+BY|SKIP|LIMIT|UNION|WITH|RETURN|MATCH|OPTIONAL|WHERE)\b|\s*;?\s*$)",
+    re.IGNORECASE | re.DOTALL,
+)
+# Clauses checked before appending a LIMIT to the final RETURN
+_RETURN_PATTERN = re.compile(r"\bRETURN\b", re.IGNORECASE)
+_LIMIT_PATTERN = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+_UNION_PATTERN = re.compile(r"\bUNION\b", re.IGNORECASE)
+
+# Tool results reach the model as compact, non-escaped JSON; measure them that way
+_dumps_compact = partial(json.dumps, separators=(",", ":"), ensure_ascii=False)
+
+# Record values json.dumps handles as-is
+_JSON_SCALAR_TYPES = (str, int, float, bool)
+
+# (opening, closing, plural, singular); str.count per character is a C-level
+# scan and beats a single Python-level or Counter pass over the query
+_BRACKET_PAIRS = (
+    ("(", ")", "parentheses", "parenthesis"),
+    ("[", "]", "brackets", "bracket"),
+    ("{", "}", "braces", "brace"),
+)
+
+# Returned by get_neo4j_schema when the schema query fails
+FALLBACK_SCHEMA = (
+    "NEO4J SCHEMA\n"
+    + "=" * 50
+    + "\n\nSchema retrieval failed. Use standard StackExchange node labels and relationship types."
+)
 
 ALLOWED_KEYWORDS = [
     "MATCH",
@@ -116,7 +200,12 @@ def initialize_neo4j_driver(uri: str, user: str, password: str) -> None:
     if _neo4j_driver is None:
         logger.info(f"Connecting to Neo4j at {uri}...")
         try:
-            _neo4j_driver = GraphDatabase.driver(uri, auth=(user, password))
+            _neo4j_driver = GraphDatabase.driver(
+                uri,
+                auth=(user, password),
+                max_transaction_retry_time=NEO4J_MAX_TRANSACTION_RETRY_TIME,
+            )
+            invalidate_schema_cache()
             # Verify connection
             _neo4j_driver.verify_connectivity()
             logger.info("Neo4j driver initialized successfully")
@@ -148,185 +237,398 @@ def set_max_tool_result_size(max_size: int) -> None:
         _max_tool_result_size = max_size
 
 
+def invalidate_schema_cache() -> None:
+    """Drop cached schemas so the next get_neo4j_schema call queries Neo4j."""
+    with _schema_lock:
+        _schema_cache.clear()
+
+
 def get_neo4j_schema(max_size: int | None = None) -> str:
     """
     Retrieve Neo4j schema and format as text for prompt injection.
 
-    Uses db.schema.nodeTypeProperties() to get comprehensive schema information
-    including node labels, relationship types, and their properties.
+    The formatted schema is cached per (database, max_size) for
+    SCHEMA_CACHE_TTL_SECONDS; a failed retrieval is not cached.
 
     Returns:
         Formatted schema string with node labels, relationship types, and properties
     """
+    key = (NEO4J_DATABASE, max_size)
+    schema = _cached_schema(key)
+    if schema is not None:
+        return schema
+
+    # One thread fetches; others waiting here pick up its result on the re-check
+    with _schema_fetch_lock:
+        schema = _cached_schema(key)
+        if schema is not None:
+            return schema
+
+        schema = _fetch_neo4j_schema(max_size)
+        if schema is not FALLBACK_SCHEMA:
+            with _schema_lock:
+                _schema_cache[key] = (time.monotonic(), schema)
+    return schema
+
+
+def _cached_schema(key: tuple[str, int | None]) -> str | None:
+    """Return the cached schema for key if it is still within the TTL."""
+    with _schema_lock:
+        cached = _schema_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < SCHEMA_CACHE_TTL_SECONDS:
+        logger.info("Using cached Neo4j schema")
+        return cached[1]
+    return None
+
+
+def _schema_section_lines(
+    title: str, properties: dict[str, list[tuple[str, list[str]]]]
+) -> Iterator[str]:
+    """Lines for one schema section: each label or type with its properties."""
+    yield f"{title}:"
+    for name in sorted(properties):
+        yield f"  - {name}"
+        props = properties[name]
+        if props:
+            yield "    Properties:"
+            for prop_name, types in props:
+                yield f"      - {prop_name}: {', '.join(types) if types else 'unknown'}"
+
+
+def _fetch_neo4j_schema(max_size: int | None) -> str:
+    """
+    Query the schema with db.schema.nodeTypeProperties() and format it.
+
+    Covers node labels, relationship types, and their properties.
+    """
     driver = get_neo4j_driver()
 
     try:
-        with driver.session(database="neo4j") as session:
-            # Query schema using db.schema.nodeTypeProperties()
-            result = session.run("CALL db.schema.nodeTypeProperties()")
-
-            node_properties = {}
-            rel_properties = {}
-            node_labels = set()
-            rel_types = set()
-
-            for record in result:
-                node_labels.add(
-                    record.get("nodeLabels", [None])[0]
-                    if record.get("nodeLabels")
-                    else None
-                )
-                rel_types.add(record.get("relType"))
-
-                properties = record.get("propertyName")
-                property_types = record.get("propertyTypes", [])
-
-                if record.get("nodeLabels"):
-                    label = record.get("nodeLabels")[0]
-                    if label:
-                        if label not in node_properties:
-                            node_properties[label] = []
-                        if properties:
-                            node_properties[label].append(
-                                {"name": properties, "types": property_types}
-                            )
-
-                if record.get("relType"):
-                    rel_type = record.get("relType")
-                    if rel_type not in rel_properties:
-                        rel_properties[rel_type] = []
-                    if properties:
-                        rel_properties[rel_type].append(
-                            {"name": properties, "types": property_types}
-                        )
-
-            schema_lines = ["NEO4J SCHEMA", "=" * 50, ""]
-
-            # Node Labels and Properties
-            schema_lines.append("NODE LABELS:")
-            for label in sorted(node_labels):
-                if label:
-                    schema_lines.append(f"  - {label}")
-                    if label in node_properties:
-                        props = node_properties[label]
-                        if props:
-                            schema_lines.append("    Properties:")
-                            for prop in props:
-                                prop_types = (
-                                    ", ".join(prop["types"])
-                                    if prop["types"]
-                                    else "unknown"
-                                )
-                                schema_lines.append(
-                                    f"      - {prop['name']}: {prop_types}"
-                                )
-
-            schema_lines.append("")
-
-            # Relationship Types and Properties
-            schema_lines.append("RELATIONSHIP TYPES:")
-            for rel_type in sorted(rel_types):
-                if rel_type:
-                    schema_lines.append(f"  - {rel_type}")
-                    if rel_type in rel_properties:
-                        props = rel_properties[rel_type]
-                        if props:
-                            schema_lines.append("    Properties:")
-                            for prop in props:
-                                prop_types = (
-                                    ", ".join(prop["types"])
-                                    if prop["types"]
-                                    else "unknown"
-                                )
-                                schema_lines.append(
-                                    f"      - {prop['name']}: {prop_types}"
-                                )
-
-            schema_text = "\n".join(schema_lines)
-
-            # Truncate schema if it exceeds max_size
-            if max_size and len(schema_text) > max_size:
-                logger.warning(
-                    f"Schema size ({len(schema_text)} chars) exceeds limit ({max_size} chars). "
-                    f"Truncating schema to prevent context overflow."
-                )
-                # Truncate and add note
-                schema_text = schema_text[:max_size]
-                # Try to truncate at a reasonable point (end of a section)
-                last_newline = schema_text.rfind("\n")
-                if (
-                    last_newline > max_size * 0.9
-                ):  # If we can find a newline near the end
-                    schema_text = schema_text[:last_newline]
-                schema_text += (
-                    f"\n\n[Schema truncated - showing first {len(schema_text)} characters. "
-                    f"Use standard StackExchange node labels and relationship types.]"
-                )
-
-            logger.info(
-                f"Neo4j schema retrieved successfully (size: {len(schema_text)} chars)"
+        records = driver.execute_query(
+            "CALL db.schema.nodeTypeProperties()",
+            database_=NEO4J_DATABASE,
+            routing_=neo4j.RoutingControl.READ,
+            result_transformer_=list,
+        )
+
+        # label / relationship type -> [(property name, property types)]
+        # defaultdict avoids building a throwaway [] per row as setdefault does
+        node_properties = defaultdict(list)
+        rel_properties = defaultdict(list)
+
+        for record in records:
+            labels = record.get("nodeLabels")
+            rel_type = record.get("relType")
+            property_name = record.get("propertyName")
+            prop = (property_name, record.get("propertyTypes") or [])
+
+            if labels and labels[0]:
+                props = node_properties[labels[0]]
+                if property_name:
+                    props.append(prop)
+
+            if rel_type:
+                props = rel_properties[rel_type]
+                if property_name:
+                    props.append(prop)
+
+        schema_text = "\n".join(
+            chain(
+                ("NEO4J SCHEMA", "=" * 50, ""),
+                _schema_section_lines("NODE LABELS", node_properties),
+                ("",),
+                _schema_section_lines("RELATIONSHIP TYPES", rel_properties),
+            )
+        )
+
+        # Truncate schema if it exceeds max_size
+        if max_size and len(schema_text) > max_size:
+            logger.warning(
+                f"Schema size ({len(schema_text)} chars) exceeds limit ({max_size} chars). "
+                f"Truncating schema to prevent context overflow."
+            )
+            # Truncate and add note
+            schema_text = schema_text[:max_size]
+            # Try to truncate at a reasonable point (end of a section)
+            # Only a newline in the last 10% is worth cutting back to
+            last_newline = schema_text.rfind("\n", int(max_size * 0.9) + 1)
+            if last_newline != -1:
+                schema_text = schema_text[:last_newline]
+            schema_text += (
+                f"\n\n[Schema truncated - showing first {len(schema_text)} characters. "
+                f"Use standard StackExchange node labels and relationship types.]"
             )
-            return schema_text
+
+        logger.info(
+            f"Neo4j schema retrieved successfully (size: {len(schema_text)} chars)"
+        )
+        return schema_text
 
     except Exception as e:
         logger.error(f"Error retrieving Neo4j schema: {e}")
         # Return a basic schema if query fails
-        return (
-            "NEO4J SCHEMA\n"
-            + "=" * 50
-            + "\n\nSchema retrieval failed. Use standard StackExchange node labels and relationship types."
-        )
+        return FALLBACK_SCHEMA
+
+
+def _mask_literals_and_comments(query: str) -> str:
+    """Blank out literals and comments, keeping every other character in place."""
+    return _LITERAL_OR_COMMENT_PATTERN.sub(
+        lambda match: " " * len(match.group()), query
+    )
+
+
+def _projection_items(projection: str) -> list[str]:
+    """Split a RETURN/WITH projection at commas outside brackets."""
+    items = []
+    depth = 0
+    start = 0
+    for position, char in enumerate(projection):
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            items.append(projection[start:position].strip())
+            start = position + 1
+    items.append(projection[start:].strip())
+    return items
+
+
+def _grouping_items(projection: str) -> set[str]:
+    """Non-aggregated items of a projection, by expression and by alias."""
+    grouping = set()
+    for item in _projection_items(projection):
+        if _AGGREGATE_CALL_PATTERN.search(item):
+            continue
+        alias = _PROJECTION_ALIAS_PATTERN.fullmatch(item)
+        if alias:
+            grouping.update((alias.group(1).strip(), alias.group(2)))
+        else:
+            grouping.add(item)
+    return grouping
+
+
+def _groups_implicitly(masked: str, clause: re.Match[str]) -> bool:
+    """Whether Cypher already groups the preceding projection by the clause's keys."""
+    keys = _GROUP_BY_KEYS_PATTERN.fullmatch(clause.group())
+    if keys is None:
+        return False
+    projection_start = deque(
+        _PROJECTION_PATTERN.finditer(masked, 0, clause.start()), maxlen=1
+    )
+    if not projection_start:
+        return False
+    projection = masked[projection_start[0].end() : clause.start()]
+    projection_end = _PROJECTION_END_PATTERN.search(projection)
+    if projection_end:
+        projection = projection[: projection_end.start()]
+    grouping = _grouping_items(projection)
+    return all(key.strip() in grouping for key in keys.group(1).split(","))
+
+
+def rewrite_group_by(query: str) -> str:
+    """
+    Remove SQL-style GROUP BY clauses from a Cypher query.
+
+    Cypher groups implicitly by the non-aggregated items of RETURN/WITH, so a
+    clause whose keys are all such items (or their aliases) changes nothing
+    and is dropped. Clauses are only looked for outside literals and
+    comments. Any other clause (HAVING, expressions, keys missing from the
+    projection) leaves the query unchanged for validation to reject.
+    """
+    if not _GROUP_BY_PATTERN.search(query):
+        return query
+
+    # Masking keeps offsets, so clause spans found there apply to the query
+    masked = _mask_literals_and_comments(query)
+    clauses = list(_GROUP_BY_CLAUSE_PATTERN.finditer(masked))
+    if not clauses or not all(_groups_implicitly(masked, clause) for clause in clauses):
+        return query
+
+    parts = []
+    position = 0
+    for clause in clauses:
+        parts.append(query[position : clause.start()])
+        position = clause.end()
+    parts.append(query[position:])
+    return "".join(parts)
+
+
+def limit_query_results(query: str, limit: int) -> str:
+    """
+    Append LIMIT to a query whose final RETURN has none.
+
+    Lets Neo4j stop producing rows the tool would discard anyway. Queries with
+    UNION or with a subquery after the last RETURN are left unchanged. Clauses
+    are only looked for outside literals and comments.
+    """
+    masked = _mask_literals_and_comments(query)
+    last_return = deque(_RETURN_PATTERN.finditer(masked), maxlen=1)
+    if not last_return or _UNION_PATTERN.search(masked):
+        return query
+
+    tail = masked[last_return[0].end() :]
+    if "}" in tail or _LIMIT_PATTERN.search(tail):
+        return query
+
+    # Drop trailing comments and semicolons; literals are kept so a query
+    # ending in one is not cut short
+    code = _LITERAL_OR_COMMENT_PATTERN.sub(
+        lambda match: (
+            match.group() if match.group()[0] in "'\"`" else " " * len(match.group())
+        ),
+        query,
+    )
+    end = len(code.rstrip().rstrip(";").rstrip())
+    return f"{query[:end]}\nLIMIT {limit}"
 
 
 def validate_cypher_query(query: str) -> tuple[bool, str | None]:
     if not query or not query.strip():
         return False, "Query is empty"
 
-    query_upper = query.upper()
+    # Keywords and brackets inside literals or comments are not part of the query;
+    # comments are stripped before whitespace normalization joins lines
+    cleaned = _mask_literals_and_comments(query)
+    # Queries differing only in whitespace share one cache entry
+    return _validate_normalized_query(" ".join(cleaned.split()))
 
-    # Check for write operations
-    for keyword in FORBIDDEN_KEYWORDS:
-        if keyword in query_upper:
-            # Check if it's actually a write operation (not in comments or strings)
-            pattern = rf"\b{keyword}\b"
-            if re.search(pattern, query_upper):
-                return (
-                    False,
-                    f"Forbidden write operation detected: {keyword}. Only read-only queries are allowed.",
-                )
 
-    # Check for GROUP BY (should use WITH aggregation instead)
-    if re.search(r"\bGROUP\s+BY\b", query_upper):
+def clear_validation_cache() -> None:
+    """Drop cached validation results (e.g. to measure cold validation runs)."""
+    _validate_normalized_query.cache_clear()
+
+
+@lru_cache(maxsize=10_000)
+def _validate_normalized_query(query: str) -> tuple[bool, str | None]:
+    # Check for write operations
+    forbidden_match = _FORBIDDEN_KEYWORD_PATTERN.search(query)
+    if forbidden_match:
         return (
             False,
-            "GROUP BY is not allowed. Use WITH aggregation instead (e.g., WITH ... count(...) as ...).",
+            f"Forbidden write operation detected: {forbidden_match.group(1).upper()}. Only read-only queries are allowed.",
         )
 
-    # Basic syntax validation - check balanced parentheses
-    paren_count = query.count("(") - query.count(")")
-    if paren_count != 0:
+    # Check for GROUP BY (should use WITH aggregation instead)
+    if _GROUP_BY_PATTERN.search(query):
         return (
             False,
-            f"Unbalanced parentheses: {abs(paren_count)} extra {'opening' if paren_count > 0 else 'closing'} parenthesis",
+            "GROUP BY is not allowed. Use WITH aggregation instead (e.g., WITH ... count(...) as ...).",
         )
 
-    # Check balanced brackets
-    bracket_count = query.count("[") - query.count("]")
-    if bracket_count != 0:
-        return (
-            False,
-            f"Unbalanced brackets: {abs(bracket_count)} extra {'opening' if bracket_count > 0 else 'closing'} bracket",
+    # Basic syntax validation - check balanced parentheses, brackets and braces
+    for opening, closing, plural, singular in _BRACKET_PAIRS:
+        count = query.count(opening) - query.count(closing)
+        if count != 0:
+            return (
+                False,
+                f"Unbalanced {plural}: {abs(count)} extra {'opening' if count > 0 else 'closing'} {singular}",
+            )
+
+    return True, None
+
+
+def _numeric_id(entity: Node | Relationship) -> int | str:
+    """
+    Numeric id of a node or relationship, as cited in "node_<id>" sources.
+
+    Element ids end in the legacy numeric id ("4:<database>:123"); reading it
+    from there avoids the deprecated .id property. Other formats are returned
+    as-is.
+    """
+    legacy_id = entity.element_id.rpartition(":")[2]
+    return int(legacy_id) if legacy_id.isdigit() else entity.element_id
+
+
+def _record_to_dict(record: neo4j.Record) -> dict[str, Any]:
+    """Convert a Neo4j record to a JSON-friendly dict."""
+    record_dict = {}
+    for key, value in record.items():
+        # Convert Neo4j types to Python types
+        if isinstance(value, (Node, Relationship)):
+            record_dict[key] = {
+                "id": _numeric_id(value),
+                "labels": list(value.labels) if isinstance(value, Node) else [],
+                "properties": dict(value),
+            }
+        elif isinstance(value, list):
+            record_dict[key] = [str(v) for v in value]
+        elif value is None or isinstance(value, _JSON_SCALAR_TYPES):
+            record_dict[key] = value
+        else:
+            # Temporal, spatial and map values
+            record_dict[key] = str(value)
+    return record_dict
+
+
+def _collect_records(
+    result: neo4j.Result, max_results: int, max_size: int
+) -> tuple[list[dict[str, Any]], int, bool, bool]:
+    """
+    Convert records until max_results or max_size chars of compact JSON.
+
+    Returns the records, their serialized size, whether a record past
+    max_results was seen and whether the size limit cut them short. The rest
+    of the stream is left unread.
+    """
+    records = []
+    size = len("[]")
+    for count, record in enumerate(result):
+        # Limit number of records to prevent token overflow
+        if count >= max_results:
+            logger.warning(
+                f"Query result limit reached ({max_results} records). "
+                f"Truncating results to prevent token limit exceeded error."
+            )
+            return records, size, True, False
+        record_dict = _record_to_dict(record)
+        # Each record after the first also adds a separating comma
+        record_size = len(_dumps_compact(record_dict)) + (1 if records else 0)
+        if size + record_size > max_size:
+            return records, size, False, True
+        records.append(record_dict)
+        size += record_size
+    return records, size, False, False
+
+
+def _query_result(
+    query: str,
+    records: list[dict[str, Any]],
+    result_size: int,
+    limit_truncated: bool,
+    size_truncated: bool,
+    max_results: int,
+    max_size: int,
+) -> dict[str, Any]:
+    """Build the tool result for collected records, summarizing any truncation."""
+    # More records were available than max_results (a row past it was seen)
+    result_summary = None
+    if limit_truncated:
+        result_summary = (
+            f"Results truncated to {max_results} records. "
+            f"Add LIMIT clause to your query to control result size."
         )
+        logger.warning(result_summary)
 
-    # Check balanced braces
-    brace_count = query.count("{") - query.count("}")
-    if brace_count != 0:
-        return (
-            False,
-            f"Unbalanced braces: {abs(brace_count)} extra {'opening' if brace_count > 0 else 'closing'} brace",
+    logger.info(f"Query executed successfully. Returned {len(records)} records.")
+
+    # Records are cut off as they are collected once the size limit is hit
+    if size_truncated:
+        result_summary = (
+            f"Results truncated to {len(records)} records due to size limit. "
+            f"Result size: {result_size} chars."
+        )
+        logger.warning(
+            f"Result size exceeds limit ({max_size} chars). {result_summary}"
         )
 
-    return True, None
+    return {
+        "results": records,
+        "query": query,
+        "error": None,
+        "truncated": limit_truncated or size_truncated,
+        "summary": result_summary,
+    }
 
 
 def execute_cypher_query(query: str) -> dict[str, Any]:
@@ -353,22 +655,17 @@ def execute_cypher_query(query: str) -> dict[str, Any]:
         RuntimeError: If Neo4j driver is not initialized or query validation fails
         ToolCallLimitExceeded: If you have exceeded the maximum of 5 tool calls.
     """
-    global _tool_call_count, _current_max_tool_calls, _initial_max_tool_calls
-
     driver = get_neo4j_driver()
 
-    # Check for suspicious counter state (shouldn't happen, but safety check)
-    with _counter_lock:
-        if _tool_call_count > _current_max_tool_calls:
-            logger.warning(
-                f"Counter state suspicious: {_tool_call_count} > {_current_max_tool_calls}. "
-                f"This suggests counter wasn't reset between queries. Resetting now."
-            )
-            _tool_call_count = DEFAULT_TOOL_CALL_COUNT
-            _current_max_tool_calls = _initial_max_tool_calls
-
+    # The agent resets the counter before each run, so a count over the limit
+    # is blocked here rather than silently reset
     _check_and_increment_tool_call_count()
 
+    rewritten_query = rewrite_group_by(query)
+    if rewritten_query != query:
+        logger.info("Removed GROUP BY clause from query (Cypher groups implicitly)")
+        query = rewritten_query
+
     is_valid, error_message = validate_cypher_query(query)
     if not is_valid:
         logger.warning(f"Query validation failed: {error_message}")
@@ -380,106 +677,39 @@ def execute_cypher_query(query: str) -> dict[str, Any]:
             "summary": None,
         }
 
+    # Snapshot the limits once so a concurrent setter can't change them mid-query
+    max_results = _max_query_results
+    max_size = _max_tool_result_size
+    # One row past the limit tells _collect_records the results were cut
+    limited_query = limit_query_results(query, max_results + 1)
+    if limited_query != query:
+        logger.info(f"Appended LIMIT {max_results + 1} to query without a LIMIT")
+
     try:
         logger.info(f"Executing Cypher query: {query[:100]}...")
 
-        with driver.session(database="neo4j") as session:
-            result = session.run(query)
-
-            # Convert results to list of dictionaries with size limiting
-            records = []
-            global _max_query_results
-            max_results = _max_query_results
-
-            for record in result:
-                # Limit number of records to prevent token overflow
-                if len(records) >= max_results:
-                    logger.warning(
-                        f"Query result limit reached ({max_results} records). "
-                        f"Truncating results to prevent token limit exceeded error."
-                    )
-                    break
-                # Convert Neo4j record to dict
-                record_dict = {}
-                for key in record.keys():
-                    value = record[key]
-                    # Convert Neo4j types to Python types
-                    if isinstance(value, list):
-                        record_dict[key] = [
-                            str(v) if hasattr(v, "__str__") else v for v in value
-                        ]
-                    elif hasattr(value, "__str__"):
-                        # Handle Neo4j node/relationship objects
-                        if hasattr(value, "id"):
-                            record_dict[key] = {
-                                "id": value.id,
-                                "labels": list(value.labels)
-                                if hasattr(value, "labels")
-                                else [],
-                                "properties": dict(value.items())
-                                if hasattr(value, "items")
-                                else {},
-                            }
-                        else:
-                            record_dict[key] = str(value)
-                    else:
-                        record_dict[key] = value
-
-                records.append(record_dict)
-
-            # Check if we hit the limit (more records available but truncated)
-            result_summary = None
-            if len(records) >= max_results:
-                # Try to get count of total records (if query supports it)
-                # Note: This is approximate - we've already consumed the result stream
-                result_summary = (
-                    f"Results truncated to {max_results} records. "
-                    f"Add LIMIT clause to your query to control result size."
-                )
-                logger.warning(result_summary)
-
-            logger.info(
-                f"Query executed successfully. Returned {len(records)} records."
-            )
+        # Managed read transaction on the driver's pool; the transformer stops
+        # pulling records once the result count or size limit is reached
+        records, result_size, limit_truncated, size_truncated = driver.execute_query(
+            limited_query,
+            database_=NEO4J_DATABASE,
+            routing_=neo4j.RoutingControl.READ,
+            result_transformer_=partial(
+                _collect_records,
+                max_results=max_results,
+                max_size=max_size,
+            ),
+        )
 
-            # Check result size to prevent token overflow
-            global _max_tool_result_size
-            result_json = json.dumps(records)
-            result_size = len(result_json)
-            size_truncated = False
-
-            if result_size > _max_tool_result_size:
-                logger.warning(
-                    f"Result size ({result_size} chars) exceeds limit ({_max_tool_result_size} chars). "
-                    f"Truncating to prevent token limit exceeded error."
-                )
-                # Truncate records to fit within size limit
-                # Estimate size per record and reduce accordingly
-                estimated_size_per_record = result_size / len(records) if records else 0
-                max_records_by_size = (
-                    int(_max_tool_result_size / estimated_size_per_record)
-                    if estimated_size_per_record > 0
-                    else len(records)
-                )
-
-                # Take the minimum of record count limit and size limit
-                final_max = min(max_results, max_records_by_size)
-                if len(records) > final_max:
-                    records = records[:final_max]
-                    size_truncated = True
-                    result_summary = (
-                        f"Results truncated to {final_max} records due to size limit. "
-                        f"Result size: {len(json.dumps(records))} chars."
-                    )
-                    logger.warning(result_summary)
-
-            return {
-                "results": records,
-                "query": query,
-                "error": None,
-                "truncated": len(records) >= max_results or size_truncated,
-                "summary": result_summary,
-            }
+        return _query_result(
+            query,
+            records,
+            result_size,
+            limit_truncated,
+            size_truncated,
+            max_results,
+            max_size,
+        )
 
     except CypherSyntaxError as e:
         error_msg = f"Cypher syntax error: {str(e)}"
@@ -1,5 +1,7 @@
 """Combined score calculation for evaluation"""
 
+from math import sqrt
+
 from config import (
     DEFAULT_SCORE_ALPHA,
     DEFAULT_SCORE_BETA,
@@ -8,6 +10,17 @@ from config import (
 )
 
 
+def _power(base: float, exponent: float) -> float:
+    """base**exponent, with the default score exponents computed without pow()."""
+    if exponent == 2.0:
+        return base * base
+    if exponent == 0.5:
+        return sqrt(base)
+    if exponent == 1.5:
+        return base * sqrt(base)
+    return base**exponent
+
+
 def calculate_combined_score(
     hit_rate: float,
     judge_score: float,
@@ -42,7 +55,7 @@ def calculate_combined_score(
     normalized_tokens = num_tokens / token_divisor
 
     # Calculate combined score
-    numerator = (hit_rate**alpha) * (judge_score**gamma)
-    denominator = normalized_tokens**beta
+    numerator = _power(hit_rate, alpha) * _power(judge_score, gamma)
+    denominator = _power(normalized_tokens, beta)
 
     return numerator / denominator if denominator > 0 else 0.0
@@ -2,6 +2,9 @@ import re
 from typing import Any
 
 FORBIDDEN_KEYWORDS = ["CREATE", "DELETE", "SET", "REMOVE", "MERGE"]
+_FORBIDDEN_KEYWORD_PATTERN = re.compile(
+    rf"\b(?:{'|'.join(FORBIDDEN_KEYWORDS)})\b", re.IGNORECASE
+)
 
 JACCARD_WEIGHT = 0.7
 LENGTH_PENALTY_WEIGHT = 0.3
@@ -35,14 +38,7 @@ def check_query_safety(query: str) -> bool:
     if not query:
         return False
 
-    query_upper = query.upper()
-
-    for keyword in FORBIDDEN_KEYWORDS:
-        pattern = rf"\b{keyword}\b"
-        if re.search(pattern, query_upper):
-            return False
-
-    return True
+    return _FORBIDDEN_KEYWORD_PATTERN.search(query) is None
 
 
 def compare_query_results(expected: list[Any], actual: list[Any]) -> float:
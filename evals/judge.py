@@ -14,7 +14,7 @@ from config import (
     DEFAULT_JUDGE_TEMPERATURE,
     DEFAULT_MAX_TOKENS,
 )
-from config.instructions import InstructionsConfig, InstructionType
+from config.instructions import InstructionType, get_instruction
 from mongodb_agent.models import JudgeEvaluation, JudgeResult, SearchAnswer, TokenUsage
 from orchestrator.models import OrchestratorAnswer
 
@@ -112,7 +112,7 @@ async def evaluate_answer(
     Returns:
         JudgeResult containing evaluation and usage
     """
-    instructions = InstructionsConfig.INSTRUCTIONS[InstructionType.JUDGE]
+    instructions = get_instruction(InstructionType.JUDGE)
 
     model = OpenAIChatModel(
         model_name=judge_model,
@@ -202,7 +202,7 @@ async def evaluate_orchestrator_answer(
     Returns:
         JudgeResult containing evaluation and usage
     """
-    instructions = InstructionsConfig.INSTRUCTIONS[InstructionType.JUDGE]
+    instructions = get_instruction(InstructionType.JUDGE)
 
     model = OpenAIChatModel(
         model_name=judge_model,
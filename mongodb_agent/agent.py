@@ -11,7 +11,7 @@ from pydantic_ai.providers.openai import OpenAIProvider
 from pymongo import MongoClient
 
 from config import DEFAULT_MAX_TOKENS
-from config.instructions import InstructionsConfig, InstructionType
+from config.instructions import InstructionType, get_instruction
 from mongodb_agent.config import (
     LIMIT_REACHED_CONFIDENCE,
     MAX_RESET_ATTEMPTS,
@@ -84,7 +84,7 @@ class MongoDBSearchAgent:
             enabled=self.config.enable_adaptive_limit,
         )
 
-        instructions = InstructionsConfig.INSTRUCTIONS[InstructionType.MONGODB_AGENT]
+        instructions = get_instruction(InstructionType.MONGODB_AGENT)
 
         model = OpenAIChatModel(
             model_name=self.config.openai_model,
@@ -134,34 +134,31 @@ class MongoDBSearchAgent:
 
         try:
             usage_obj = result.usage()
-            return TokenUsage(
-                input_tokens=usage_obj.input_tokens,
-                output_tokens=usage_obj.output_tokens,
-                total_tokens=usage_obj.input_tokens + usage_obj.output_tokens,
-            )
-        except (AttributeError, Exception) as usage_error:
+            input_tokens = usage_obj.input_tokens
+            output_tokens = usage_obj.output_tokens
+            total_tokens = input_tokens + output_tokens
+        except (AttributeError, TypeError) as usage_error:
             logger.warning(
                 f"Could not extract token usage from result: {usage_error}. "
                 f"Using fallback token usage."
             )
             return TokenUsage(input_tokens=0, output_tokens=0, total_tokens=0)
 
+        return TokenUsage(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=total_tokens,
+        )
+
     def _extract_sources_from_result(self, result: Any) -> list[str]:
         """Extract sources from result output if available, otherwise from tracked sources."""
         # First try to get sources from result output (if LLM finished synthesizing)
-        if result is not None:
-            try:
-                output = result.output
-                if isinstance(output, SearchAnswer) and output.sources_used:
-                    logger.info(
-                        f"Extracted {len(output.sources_used)} sources from result output"
-                    )
-                    return output.sources_used
-            except (AttributeError, Exception) as source_error:
-                logger.debug(
-                    f"Could not extract sources from result: {source_error}. "
-                    f"Falling back to tracked sources."
-                )
+        output = getattr(result, "output", None)
+        if isinstance(output, SearchAnswer) and output.sources_used:
+            logger.info(
+                f"Extracted {len(output.sources_used)} sources from result output"
+            )
+            return output.sources_used
 
         # Fallback: get sources from tracked search results
         tracked_sources = get_sources()
@@ -322,7 +319,7 @@ class MongoDBSearchAgent:
 
             return SearchAgentResult(
                 answer=result.output,
-                tool_calls=tool_calls.copy(),
+                tool_calls=tool_calls,
                 token_usage=token_usage,
             )
 
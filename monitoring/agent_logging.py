@@ -17,6 +17,9 @@ logger = logging.getLogger(__name__)
 
 UsageTypeAdapter = pydantic.TypeAdapter(RunUsage)
 
+# The event loop only keeps weak references to tasks; hold pending log tasks here
+_background_tasks: set[asyncio.Task] = set()
+
 
 def _create_log_entry(
     agent: Agent,
@@ -192,7 +195,11 @@ def log_agent_run_async(
     """
     try:
         # Create background task - don't await it
-        asyncio.create_task(_log_agent_run_with_error_handling(agent, result, question))
+        task = asyncio.create_task(
+            _log_agent_run_with_error_handling(agent, result, question)
+        )
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
     except Exception as e:
         # If we can't even create the task, log it but don't raise
         logger.warning(f"Failed to create background logging task: {e}")
@@ -7,7 +7,7 @@ from pydantic_ai import Agent
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic_ai.providers.openai import OpenAIProvider
 
-from config import DEFAULT_MAX_TOKENS, InstructionsConfig, InstructionType
+from config import DEFAULT_MAX_TOKENS, InstructionType, get_instruction
 from mongodb_agent.models import TokenUsage
 from orchestrator.config import OrchestratorConfig
 from orchestrator.models import OrchestratorAgentResult, OrchestratorAnswer
@@ -32,9 +32,7 @@ class OrchestratorAgent:
         logger.info("Initializing Orchestrator Agent...")
 
         # Get instructions from config
-        instructions = InstructionsConfig.INSTRUCTIONS[
-            InstructionType.ORCHESTRATOR_AGENT
-        ]
+        instructions = get_instruction(InstructionType.ORCHESTRATOR_AGENT)
 
         # Initialize OpenAI model
         model = OpenAIChatModel(
@@ -65,18 +63,22 @@ class OrchestratorAgent:
         """Extract token usage from result, with fallback to zero if unavailable."""
         try:
             usage_obj = result.usage()
-            return TokenUsage(
-                input_tokens=usage_obj.input_tokens,
-                output_tokens=usage_obj.output_tokens,
-                total_tokens=usage_obj.input_tokens + usage_obj.output_tokens,
-            )
-        except (AttributeError, Exception) as usage_error:
+            input_tokens = usage_obj.input_tokens
+            output_tokens = usage_obj.output_tokens
+            total_tokens = input_tokens + output_tokens
+        except (AttributeError, TypeError) as usage_error:
             logger.warning(
                 f"Could not extract token usage from result: {usage_error}. "
                 f"Using fallback token usage."
             )
             return TokenUsage(input_tokens=0, output_tokens=0, total_tokens=0)
 
+        return TokenUsage(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=total_tokens,
+        )
+
     async def query(self, question: str) -> OrchestratorAgentResult:
         """
         Run orchestrator query and return result with answer and token usage
@@ -6,6 +6,7 @@ import pytest
 
 from cypher_agent.config import CypherAgentConfig
 from cypher_agent.models import CypherAgentResult, CypherAnswer, TokenUsage
+from cypher_agent.tools import invalidate_schema_cache
 
 TEST_QUESTION = "How many users are in the database?"
 TEST_QUERY = "MATCH (u:User) RETURN count(u) as user_count"
@@ -19,6 +20,14 @@ TEST_SOURCE_NODE_1 = "node_1"
 TEST_SOURCE_NODE_2 = "node_2"
 
 
+@pytest.fixture(autouse=True)
+def clear_schema_cache():
+    """Each test fetches the (mocked) schema itself"""
+    invalidate_schema_cache()
+    yield
+    invalidate_schema_cache()
+
+
 @pytest.fixture
 def cypher_config():
     """CypherAgentConfig for testing"""
@@ -82,11 +91,14 @@ RELATIONSHIP TYPES:
 
 @pytest.fixture
 def mock_neo4j_driver():
-    """Mock Neo4j driver"""
+    """Mock Neo4j driver; set driver.query_result to control what a query yields"""
     driver = MagicMock()
-    session = MagicMock()
-    driver.session.return_value.__enter__.return_value = session
-    driver.session.return_value.__exit__.return_value = None
+    driver.query_result = MagicMock(return_value=[])
+
+    def execute_query(query, *, result_transformer_, **kwargs):
+        return result_transformer_(driver.query_result(query))
+
+    driver.execute_query.side_effect = execute_query
     driver.verify_connectivity = MagicMock()
     return driver
 
@@ -3,9 +3,12 @@
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from pydantic_ai.messages import FunctionToolCallEvent, ToolCallPart
 
+from config.instructions import InstructionType, get_instruction
 from cypher_agent.agent import CypherQueryAgent
 from cypher_agent.models import CypherAgentResult, CypherAnswer, TokenUsage
+from cypher_agent.tools import FALLBACK_SCHEMA
 from tests.cypher_agent.conftest import (
     TEST_ANSWER,
     TEST_CONFIDENCE,
@@ -36,6 +39,10 @@ TEST_MIN_TOOL_CALLS = 1
 TEST_MAX_TOOL_CALLS = 5
 TEST_TOOL_CALL_COUNT_BEFORE_RESET = 2
 TEST_TOOL_CALL_COUNT_AFTER_RESET = 0
+TEST_MAX_CYPHER_EXAMPLES = 1
+TEST_TOOL_NAME = "execute_cypher_query"
+TEST_AGENT_BUILDS_AFTER_CHANGE = 2
+TEST_EXAMPLE_QUESTION = "Which users asked about frustration and answered others?"
 
 
 @pytest.fixture
@@ -106,6 +113,63 @@ class TestCypherQueryAgent:
         assert "{schema}" not in instructions
         assert mock_neo4j_schema in instructions or "NEO4J SCHEMA" in instructions
 
+    @pytest.mark.parametrize("max_cypher_examples", [None, TEST_MAX_CYPHER_EXAMPLES])
+    def test_reinitialize_picks_up_new_schema(self, patched_agent, max_cypher_examples):
+        """Test that initializing again refreshes the schema and rebuilds the Agent"""
+        agent, mocks = patched_agent
+        agent.config.max_cypher_examples = max_cypher_examples
+        agent.initialize()
+        builds = mocks["agent_class"].call_count
+
+        mocks["get_schema"].return_value = FALLBACK_SCHEMA
+        agent.initialize()
+
+        assert agent.schema == FALLBACK_SCHEMA
+        assert mocks["agent_class"].call_count == builds + 1
+
+    def test_reinitialize_reuses_agent(self, patched_agent):
+        """Test that the Agent is only rebuilt when its configuration changed"""
+        agent, mocks = patched_agent
+
+        agent.initialize()
+        mocks["agent_class"].assert_called_once()
+
+        agent.config.max_tokens += 1
+        agent.initialize()
+        assert mocks["agent_class"].call_count == TEST_AGENT_BUILDS_AFTER_CHANGE
+
+    def test_model_shared_across_agents(self, patched_agent, cypher_config):
+        """Test that agents for the same model share one OpenAI model/provider"""
+        _, mocks = patched_agent
+        first_model = mocks["agent_class"].call_args.kwargs["model"]
+
+        CypherQueryAgent(cypher_config).initialize()
+
+        assert mocks["agent_class"].call_args.kwargs["model"] is first_model
+
+    def test_instructions_have_one_schema_marker(self):
+        """Test that the Cypher prompt has exactly one {schema} splice point"""
+        instructions = get_instruction(InstructionType.CYPHER_QUERY_AGENT)
+
+        assert instructions.count("{schema}") == 1
+
+    def test_instructions_select_relevant_examples(
+        self, patched_agent, mock_neo4j_schema
+    ):
+        """Test that max_cypher_examples picks examples per question at run time"""
+        agent, _ = patched_agent
+        agent.config.max_cypher_examples = TEST_MAX_CYPHER_EXAMPLES
+        ctx = MagicMock()
+        ctx.prompt = TEST_EXAMPLE_QUESTION
+
+        instructions = agent._instructions_for_question(ctx)
+
+        assert "{schema}" not in instructions
+        assert mock_neo4j_schema in instructions
+        assert "Example 1:" in instructions
+        assert "Example 2:" not in instructions
+        assert "'frustration'" in instructions
+
     @pytest.mark.asyncio
     async def test_query_success(self, patched_agent, mock_pydantic_ai_agent):
         """Test successful query execution"""
@@ -180,6 +244,80 @@ class TestCypherQueryAgent:
         assert result.token_usage.output_tokens == output_tokens
         assert result.token_usage.total_tokens == expected_total
 
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("verbose", [True, False])
+    async def test_tool_call_progress_respects_verbose(
+        self, patched_agent, mock_agent_result, capsys, verbose
+    ):
+        """Test that tool calls are tracked but only printed when verbose"""
+        agent, mocks = patched_agent
+        agent.config.verbose = verbose
+        event = FunctionToolCallEvent(
+            part=ToolCallPart(tool_name=TEST_TOOL_NAME, args={"query": TEST_QUERY})
+        )
+
+        async def run_with_tool_call(question, event_stream_handler):
+            await event_stream_handler(None, event)
+            return mock_agent_result
+
+        mocks["agent_instance"].run = run_with_tool_call
+
+        with patch("cypher_agent.agent.log_agent_run_async"):
+            result = await agent.query(TEST_QUESTION)
+
+        assert result.tool_calls == [
+            {"tool_name": TEST_TOOL_NAME, "args": {"query": TEST_QUERY}}
+        ]
+        assert ("Tool call #1" in capsys.readouterr().out) is verbose
+
+    @pytest.mark.asyncio
+    async def test_tool_call_preview_from_raw_json_args(
+        self, patched_agent, mock_agent_result, capsys
+    ):
+        """Test that the printed preview shows the query from unparsed JSON args"""
+        agent, mocks = patched_agent
+        event = FunctionToolCallEvent(
+            part=ToolCallPart(
+                tool_name=TEST_TOOL_NAME, args=f'{{"query": "{TEST_QUERY}"}}'
+            )
+        )
+
+        async def run_with_tool_call(question, event_stream_handler):
+            await event_stream_handler(None, event)
+            return mock_agent_result
+
+        mocks["agent_instance"].run = run_with_tool_call
+
+        with patch("cypher_agent.agent.log_agent_run_async"):
+            await agent.query(TEST_QUESTION)
+
+        assert f"with query: {TEST_QUERY}..." in capsys.readouterr().out
+
+    @pytest.mark.asyncio
+    async def test_tool_calls_tracked_in_nested_streams(
+        self, patched_agent, mock_agent_result
+    ):
+        """Test that tool calls inside nested event streams are tracked"""
+        agent, mocks = patched_agent
+        event = FunctionToolCallEvent(
+            part=ToolCallPart(tool_name=TEST_TOOL_NAME, args={"query": TEST_QUERY})
+        )
+
+        async def nested_stream():
+            yield event
+
+        async def run_with_nested_stream(question, event_stream_handler):
+            await event_stream_handler(None, nested_stream())
+            await event_stream_handler(None, object())
+            return mock_agent_result
+
+        mocks["agent_instance"].run = run_with_nested_stream
+
+        with patch("cypher_agent.agent.log_agent_run_async"):
+            result = await agent.query(TEST_QUESTION)
+
+        assert [call["tool_name"] for call in result.tool_calls] == [TEST_TOOL_NAME]
+
 
 @pytest.mark.parametrize(
     "sources,expected",
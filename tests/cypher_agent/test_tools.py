@@ -1,19 +1,34 @@
 """Tests for Cypher Query Agent tools"""
 
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
+import neo4j
 import pytest
+from neo4j.graph import Graph, Node
 
+from cypher_agent.agent import _SOURCE_ID_PATTERN
 from cypher_agent.tools import (
+    FALLBACK_SCHEMA,
+    NEO4J_DATABASE,
+    NEO4J_MAX_TRANSACTION_RETRY_TIME,
+    SCHEMA_CACHE_TTL_SECONDS,
     _check_and_increment_tool_call_count,
+    _validate_normalized_query,
+    clear_validation_cache,
     execute_cypher_query,
     get_neo4j_driver,
     get_neo4j_schema,
     get_tool_call_count,
     initialize_neo4j_driver,
+    invalidate_schema_cache,
+    limit_query_results,
     reset_tool_call_count,
+    rewrite_group_by,
     set_max_query_results,
     set_max_tool_calls,
+    set_max_tool_result_size,
     validate_cypher_query,
 )
 from mongodb_agent.tools import ToolCallLimitExceeded
@@ -33,6 +48,16 @@ TEST_QUERY_RESULT_COUNT_LARGE = 150
 TEST_QUERY_RESULT_LIMIT = 50
 TEST_QUERY_RESULT_COUNT_SMALL = 10
 TEST_QUERY_RESULT_LIMIT_LARGE = 100
+TEST_CACHE_MISSES_SINGLE = 1
+TEST_CACHE_HITS_SINGLE = 1
+TEST_SCHEMA_FETCH_COUNT_TWO = 2
+TEST_INJECTED_LIMIT = 101
+TEST_NODE_ID = 42
+TEST_ELEMENT_ID = f"4:test:{TEST_NODE_ID}"
+TEST_RESULT_SIZE_LIMIT = 30
+TEST_DEFAULT_RESULT_SIZE_LIMIT = 50000
+TEST_CONCURRENT_SCHEMA_CALLS = 4
+TEST_SLOW_SCHEMA_QUERY_SECONDS = 0.05
 
 
 @pytest.mark.parametrize(
@@ -51,6 +76,8 @@ TEST_QUERY_RESULT_LIMIT_LARGE = 100
         ("MATCH (n:User) DELETE n", False),
         ("MATCH (n:User) SET n.name = 'test' RETURN n", False),
         ("MERGE (n:User {id: 1}) RETURN n", False),
+        ("match (n:User) detach delete n", False),
+        ("match (u:User)-[:ASKED]->(q:Question) return u, count(q) group by u", False),
         ("MATCH (u:User)-[:ASKED]->(q:Question) RETURN u, count(q) GROUP BY u", False),
         ("", False),
         ("   \n\t  ", False),
@@ -66,12 +93,165 @@ def test_validate_cypher_query(query, expected_valid):
         assert error is not None
 
 
+@pytest.mark.parametrize(
+    "query,expected_valid",
+    [
+        ("MATCH (q:Question) WHERE q.title = 'How to CREATE a set?' RETURN q", True),
+        ('MATCH (q:Question) WHERE q.body CONTAINS "DELETE (" RETURN q', True),
+        ("MATCH (n:`Set`) RETURN n", True),
+        ("// merge users later\nMATCH (n:User) RETURN n", True),
+        ("MATCH (n:User) /* SET n.x = 1 */ RETURN n", True),
+        ("// read users\nMATCH (n:User) DELETE n", False),
+        ("MATCH (n:User) WHERE n.name = 'it\\'s' SET n.x = 1", False),
+    ],
+)
+def test_validate_cypher_query_ignores_literals_and_comments(query, expected_valid):
+    is_valid, _ = validate_cypher_query(query)
+    assert is_valid == expected_valid
+
+
+def test_validate_cypher_query_reports_keyword_uppercase():
+    is_valid, error = validate_cypher_query("match (n:User) set n.name = 'x' return n")
+    assert not is_valid
+    assert "Forbidden write operation detected: SET." in error
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        (
+            "MATCH (u:User)-[:ASKED]->(q:Question) RETURN u, count(q) GROUP BY u",
+            "MATCH (u:User)-[:ASKED]->(q:Question) RETURN u, count(q)",
+        ),
+        (
+            "MATCH (u:User)-[:ASKED]->(q:Question) RETURN u, count(q) AS c group by u ORDER BY c DESC LIMIT 5",
+            "MATCH (u:User)-[:ASKED]->(q:Question) RETURN u, count(q) AS c ORDER BY c DESC LIMIT 5",
+        ),
+        (
+            "MATCH (t:Tag)<-[:HAS_TAG]-(q:Question) WITH t.name AS tag, count(q) AS c GROUP BY tag RETURN tag, c",
+            "MATCH (t:Tag)<-[:HAS_TAG]-(q:Question) WITH t.name AS tag, count(q) AS c RETURN tag, c",
+        ),
+        (
+            "MATCH (u:User)-[:ASKED]->(q:Question) RETURN DISTINCT u.name, u.country, count(q) AS c GROUP BY u.country, u.name",
+            "MATCH (u:User)-[:ASKED]->(q:Question) RETURN DISTINCT u.name, u.country, count(q) AS c",
+        ),
+        ("MATCH (n:User) RETURN n LIMIT 10", "MATCH (n:User) RETURN n LIMIT 10"),
+    ],
+)
+def test_rewrite_group_by(query, expected):
+    rewritten = rewrite_group_by(query)
+    assert rewritten == expected
+    assert validate_cypher_query(rewritten)[0]
+
+
+def test_rewrite_group_by_ignores_literals_and_comments():
+    query = (
+        "MATCH (q:Question) WHERE q.title CONTAINS 'group by' "
+        "RETURN q.title // group by title"
+    )
+    assert rewrite_group_by(query) == query
+    assert validate_cypher_query(query)[0]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "MATCH (u:User)-[:ASKED]->(q:Question) WITH u, count(q) AS c GROUP BY u HAVING c > 5 RETURN u, c",
+        "MATCH (u:User)-[:ASKED]->(q:Question) RETURN u, count(q) GROUP BY toLower(u.name)",
+        "MATCH (q:Question) RETURN q.score, count(q) GROUP BY q.score, 'x'",
+        "MATCH (u:User)-[:ASKED]->(q:Question) RETURN count(q) AS c GROUP BY u",
+        "MATCH (u:User)-[:ASKED]->(q:Question) RETURN u.name, count(q) AS c GROUP BY u.country",
+        "MATCH (t:Tag)<-[:HAS_TAG]-(q:Question) WITH t, count(q) AS c GROUP BY t.name RETURN t.name, c",
+    ],
+)
+def test_rewrite_group_by_keeps_non_key_clauses(query):
+    assert rewrite_group_by(query) == query
+    assert not validate_cypher_query(query)[0]
+
+
+def test_execute_query_rewrites_group_by(mock_neo4j_driver, reset_counter):
+    query_result = mock_neo4j_driver.query_result
+    query_result.return_value = []
+
+    with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
+        result = execute_cypher_query(
+            "MATCH (u:User)-[:ASKED]->(q:Question) RETURN u, count(q) GROUP BY u LIMIT 5"
+        )
+
+    assert result["error"] is None
+    query_result.assert_called_once_with(
+        "MATCH (u:User)-[:ASKED]->(q:Question) RETURN u, count(q) LIMIT 5"
+    )
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ("MATCH (n:User) RETURN n", "MATCH (n:User) RETURN n\nLIMIT 101"),
+        (
+            "MATCH (n:User) RETURN n ORDER BY n.reputation DESC;",
+            "MATCH (n:User) RETURN n ORDER BY n.reputation DESC\nLIMIT 101",
+        ),
+        (
+            "MATCH (n:User) WITH n LIMIT 3 RETURN n",
+            "MATCH (n:User) WITH n LIMIT 3 RETURN n\nLIMIT 101",
+        ),
+        ("MATCH (n:User) RETURN n LIMIT 10", "MATCH (n:User) RETURN n LIMIT 10"),
+        (
+            "MATCH (u:User) RETURN u.name AS name UNION MATCH (t:Tag) RETURN t.name AS name",
+            "MATCH (u:User) RETURN u.name AS name UNION MATCH (t:Tag) RETURN t.name AS name",
+        ),
+        ("CALL db.labels()", "CALL db.labels()"),
+        ("MATCH (n) RETURN n; // done", "MATCH (n) RETURN n\nLIMIT 101"),
+        ("MATCH (n) RETURN n // no limit here", "MATCH (n) RETURN n\nLIMIT 101"),
+        (
+            "MATCH (n) RETURN n.name = 'a; b // c}'",
+            "MATCH (n) RETURN n.name = 'a; b // c}'\nLIMIT 101",
+        ),
+    ],
+)
+def test_limit_query_results(query, expected):
+    assert limit_query_results(query, TEST_INJECTED_LIMIT) == expected
+
+
+def test_execute_query_injects_limit(mock_neo4j_driver, reset_counter):
+    query_result = mock_neo4j_driver.query_result
+    set_max_query_results(TEST_QUERY_RESULT_LIMIT)
+
+    try:
+        with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
+            result = execute_cypher_query("MATCH (n:User) RETURN n")
+    finally:
+        set_max_query_results(TEST_QUERY_RESULT_LIMIT_LARGE)
+
+    assert result["query"] == "MATCH (n:User) RETURN n"
+    query_result.assert_called_once_with(
+        f"MATCH (n:User) RETURN n\nLIMIT {TEST_QUERY_RESULT_LIMIT + 1}"
+    )
+
+
+def test_validate_cypher_query_caches_whitespace_variants():
+    clear_validation_cache()
+
+    validate_cypher_query("MATCH (n:User) RETURN n LIMIT 10")
+    validate_cypher_query("MATCH  (n:User)\n RETURN n\tLIMIT 10")
+
+    cache_info = _validate_normalized_query.cache_info()
+    assert cache_info.misses == TEST_CACHE_MISSES_SINGLE
+    assert cache_info.hits == TEST_CACHE_HITS_SINGLE
+
+    clear_validation_cache()
+    assert _validate_normalized_query.cache_info().currsize == 0
+
+
 @patch("cypher_agent.tools.GraphDatabase")
 def test_initialize_neo4j_driver(mock_graph_db, mock_neo4j_driver):
     mock_graph_db.driver.return_value = mock_neo4j_driver
     initialize_neo4j_driver("bolt://localhost:7687", "neo4j", "password")
     mock_graph_db.driver.assert_called_once_with(
-        "bolt://localhost:7687", auth=("neo4j", "password")
+        "bolt://localhost:7687",
+        auth=("neo4j", "password"),
+        max_transaction_retry_time=NEO4J_MAX_TRANSACTION_RETRY_TIME,
     )
     mock_neo4j_driver.verify_connectivity.assert_called_once()
 
@@ -88,7 +268,7 @@ def test_get_neo4j_driver_initialized(mock_neo4j_driver):
 
 
 def test_get_schema_success(mock_neo4j_driver, mock_neo4j_schema):
-    session = mock_neo4j_driver.session.return_value.__enter__.return_value
+    query_result = mock_neo4j_driver.query_result
     mock_record = MagicMock()
     mock_record.get.side_effect = lambda key, default=None: {
         "nodeLabels": ["User"],
@@ -96,18 +276,52 @@ def test_get_schema_success(mock_neo4j_driver, mock_neo4j_schema):
         "propertyName": "user_id",
         "propertyTypes": ["Integer"],
     }.get(key, default)
-    session.run.return_value = [mock_record]
+    query_result.return_value = [mock_record]
 
     with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
         schema = get_neo4j_schema()
 
     assert "NEO4J SCHEMA" in schema
-    session.run.assert_called_once_with("CALL db.schema.nodeTypeProperties()")
+    query_result.assert_called_once_with("CALL db.schema.nodeTypeProperties()")
+
+
+def test_get_schema_mixed_node_and_relationship_rows(mock_neo4j_driver):
+    """Test that rows without a label or relationship type are formatted"""
+    mock_neo4j_driver.query_result.return_value = [
+        neo4j.Record(
+            {
+                "nodeLabels": ["User"],
+                "relType": None,
+                "propertyName": "user_id",
+                "propertyTypes": ["Long"],
+            }
+        ),
+        neo4j.Record({"nodeLabels": ["Tag"], "relType": None, "propertyName": None}),
+        neo4j.Record(
+            {"nodeLabels": [], "relType": "ASKED", "propertyName": "creation_date"}
+        ),
+    ]
+
+    with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
+        schema = get_neo4j_schema()
+
+    assert schema == (
+        "NEO4J SCHEMA\n" + "=" * 50 + "\n\nNODE LABELS:\n"
+        "  - Tag\n"
+        "  - User\n"
+        "    Properties:\n"
+        "      - user_id: Long\n"
+        "\n"
+        "RELATIONSHIP TYPES:\n"
+        "  - ASKED\n"
+        "    Properties:\n"
+        "      - creation_date: unknown"
+    )
 
 
 def test_get_schema_connection_error(mock_neo4j_driver):
-    session = mock_neo4j_driver.session.return_value.__enter__.return_value
-    session.run.side_effect = Exception("Connection failed")
+    query_result = mock_neo4j_driver.query_result
+    query_result.side_effect = Exception("Connection failed")
 
     with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
         schema = get_neo4j_schema()
@@ -115,15 +329,79 @@ def test_get_schema_connection_error(mock_neo4j_driver):
     assert "Schema retrieval failed" in schema
 
 
+def test_get_schema_cached(mock_neo4j_driver):
+    """Test that the formatted schema is reused until invalidated"""
+    query_result = mock_neo4j_driver.query_result
+    query_result.return_value = []
+
+    with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
+        first = get_neo4j_schema()
+        second = get_neo4j_schema()
+        invalidate_schema_cache()
+        get_neo4j_schema()
+
+    assert second is first
+    assert query_result.call_count == TEST_SCHEMA_FETCH_COUNT_TWO
+
+
+def test_get_schema_concurrent_misses_fetch_once(mock_neo4j_driver):
+    """Test that threads missing the cache together share a single fetch"""
+    query_result = mock_neo4j_driver.query_result
+
+    def slow_schema_query(query):
+        time.sleep(TEST_SLOW_SCHEMA_QUERY_SECONDS)
+        return []
+
+    query_result.side_effect = slow_schema_query
+
+    with (
+        patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver),
+        ThreadPoolExecutor(max_workers=TEST_CONCURRENT_SCHEMA_CALLS) as executor,
+    ):
+        schemas = list(
+            executor.map(
+                lambda _: get_neo4j_schema(), range(TEST_CONCURRENT_SCHEMA_CALLS)
+            )
+        )
+
+    assert len(set(schemas)) == 1
+    assert query_result.call_count == TEST_CACHE_MISSES_SINGLE
+
+
+def test_get_schema_cache_expires(mock_neo4j_driver):
+    """Test that a cached schema older than the TTL is fetched again"""
+    query_result = mock_neo4j_driver.query_result
+    query_result.return_value = []
+
+    with (
+        patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver),
+        patch("cypher_agent.tools.time.monotonic") as mock_monotonic,
+    ):
+        mock_monotonic.return_value = 0.0
+        get_neo4j_schema()
+        mock_monotonic.return_value = SCHEMA_CACHE_TTL_SECONDS
+        get_neo4j_schema()
+
+    assert query_result.call_count == TEST_SCHEMA_FETCH_COUNT_TWO
+
+
+def test_get_schema_fallback_not_cached(mock_neo4j_driver):
+    """Test that a failed retrieval is retried on the next call"""
+    query_result = mock_neo4j_driver.query_result
+    query_result.side_effect = Exception("Connection failed")
+
+    with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
+        assert get_neo4j_schema() is FALLBACK_SCHEMA
+        get_neo4j_schema()
+
+    assert query_result.call_count == TEST_SCHEMA_FETCH_COUNT_TWO
+
+
 def test_execute_valid_query(mock_neo4j_driver):
-    session = mock_neo4j_driver.session.return_value.__enter__.return_value
-    mock_record = MagicMock()
-    mock_record.keys.return_value = ["user_id", "display_name"]
-    mock_record.__getitem__.side_effect = lambda key: {
-        "user_id": TEST_USER_ID,
-        "display_name": "TestUser",
-    }[key]
-    session.run.return_value = [mock_record]
+    query_result = mock_neo4j_driver.query_result
+    query_result.return_value = [
+        neo4j.Record({"user_id": TEST_USER_ID, "display_name": "TestUser"})
+    ]
 
     with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
         result = execute_cypher_query(
@@ -132,8 +410,46 @@ def test_execute_valid_query(mock_neo4j_driver):
 
     assert result["error"] is None
     assert len(result["results"]) == TEST_EXPECTED_RESULT_COUNT_SINGLE
-    assert result["results"][0]["user_id"] == str(TEST_USER_ID)
+    assert result["results"][0]["user_id"] == TEST_USER_ID
     assert result["results"][0]["display_name"] == "TestUser"
+    execute_kwargs = mock_neo4j_driver.execute_query.call_args.kwargs
+    assert execute_kwargs["routing_"] == neo4j.RoutingControl.READ
+    assert execute_kwargs["database_"] == NEO4J_DATABASE
+
+
+def test_execute_query_converts_graph_values(mock_neo4j_driver, reset_counter):
+    node = Node(
+        Graph(), TEST_ELEMENT_ID, TEST_NODE_ID, ["User"], {"user_id": TEST_USER_ID}
+    )
+    values = {"u": node, "tags": ["ux", 1], "seen": None}
+    mock_neo4j_driver.query_result.return_value = [neo4j.Record(values)]
+
+    with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
+        result = execute_cypher_query("MATCH (u:User) RETURN u LIMIT 1")
+
+    assert result["results"] == [
+        {
+            "u": {
+                "id": TEST_NODE_ID,
+                "labels": ["User"],
+                "properties": {"user_id": TEST_USER_ID},
+            },
+            "tags": ["ux", "1"],
+            "seen": None,
+        }
+    ]
+
+
+def test_execute_query_node_id_is_citable(mock_neo4j_driver, reset_counter):
+    """Test that a node's id forms a "node_<id>" source the agent keeps"""
+    node = Node(Graph(), TEST_ELEMENT_ID, TEST_NODE_ID, ["User"], {})
+    mock_neo4j_driver.query_result.return_value = [neo4j.Record({"u": node})]
+
+    with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
+        result = execute_cypher_query("MATCH (u:User) RETURN u LIMIT 1")
+
+    node_id = result["results"][0]["u"]["id"]
+    assert _SOURCE_ID_PATTERN.match(f"node_{node_id}")
 
 
 def test_execute_invalid_query(mock_neo4j_driver):
@@ -154,8 +470,8 @@ def test_execute_invalid_query(mock_neo4j_driver):
 def test_execute_query_errors(mock_neo4j_driver, exception_class, error_keyword, query):
     from neo4j.exceptions import CypherSyntaxError, ServiceUnavailable
 
-    session = mock_neo4j_driver.session.return_value.__enter__.return_value
-    session.run.side_effect = {
+    query_result = mock_neo4j_driver.query_result
+    query_result.side_effect = {
         "CypherSyntaxError": CypherSyntaxError("Invalid syntax"),
         "ServiceUnavailable": ServiceUnavailable("Service unavailable"),
     }[exception_class]
@@ -169,8 +485,8 @@ def test_execute_query_errors(mock_neo4j_driver, exception_class, error_keyword,
 
 
 def test_execute_query_empty_results(mock_neo4j_driver):
-    session = mock_neo4j_driver.session.return_value.__enter__.return_value
-    session.run.return_value = []
+    query_result = mock_neo4j_driver.query_result
+    query_result.return_value = []
 
     with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
         result = execute_cypher_query(
@@ -238,6 +554,19 @@ def test_counter_resets_between_queries(setup_limit):
     assert get_tool_call_count() == TEST_TOOL_CALL_COUNT_ONE
 
 
+def test_execute_query_blocks_count_over_lowered_limit(mock_neo4j_driver, setup_limit):
+    for _ in range(TEST_TOOL_CALL_COUNT_TWO):
+        _check_and_increment_tool_call_count()
+    set_max_tool_calls(TEST_TOOL_CALL_COUNT_ONE)
+
+    with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
+        with pytest.raises(ToolCallLimitExceeded):
+            execute_cypher_query("MATCH (n:User) RETURN n LIMIT 1")
+
+    assert get_tool_call_count() == TEST_TOOL_CALL_COUNT_TWO
+    mock_neo4j_driver.execute_query.assert_not_called()
+
+
 @pytest.mark.parametrize(
     "initial_limit,new_limit",
     [(3, 5), (2, 3)],
@@ -264,7 +593,7 @@ def test_set_max_tool_calls(reset_counter, initial_limit, new_limit):
 
 def test_get_schema_truncation(mock_neo4j_driver):
     """Test that schema is truncated when it exceeds max_size"""
-    session = mock_neo4j_driver.session.return_value.__enter__.return_value
+    query_result = mock_neo4j_driver.query_result
     # Create many records to generate a large schema
     mock_records = []
     for i in range(TEST_SCHEMA_RECORD_COUNT):
@@ -276,7 +605,7 @@ def test_get_schema_truncation(mock_neo4j_driver):
             "propertyTypes": ["String"],
         }.get(key, default)
         mock_records.append(mock_record)
-    session.run.return_value = mock_records
+    query_result.return_value = mock_records
 
     with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
         # Test with small max_size
@@ -291,18 +620,12 @@ def test_execute_query_result_limiting(mock_neo4j_driver):
     """Test that query results are limited to max_query_results"""
     from cypher_agent.tools import set_max_query_results
 
-    session = mock_neo4j_driver.session.return_value.__enter__.return_value
-    # Create many mock records to test limiting
-    mock_records = []
-    for i in range(TEST_QUERY_RESULT_COUNT_LARGE):
-        mock_record = MagicMock()
-        mock_record.keys.return_value = ["id", "name"]
-        mock_record.__getitem__.side_effect = lambda key, idx=i: {
-            "id": idx,
-            "name": f"Test{idx}",
-        }[key]
-        mock_records.append(mock_record)
-    session.run.return_value = mock_records
+    query_result = mock_neo4j_driver.query_result
+    # Create many records to test limiting
+    query_result.return_value = [
+        neo4j.Record({"id": i, "name": f"Test{i}"})
+        for i in range(TEST_QUERY_RESULT_COUNT_LARGE)
+    ]
 
     # Set max results limit
     set_max_query_results(TEST_QUERY_RESULT_LIMIT)
@@ -321,15 +644,11 @@ def test_execute_query_result_limiting(mock_neo4j_driver):
 def test_execute_query_no_truncation_when_under_limit(mock_neo4j_driver):
     from cypher_agent.tools import set_max_query_results
 
-    session = mock_neo4j_driver.session.return_value.__enter__.return_value
-    # Create mock records (under limit)
-    mock_records = []
-    for i in range(TEST_QUERY_RESULT_COUNT_SMALL):
-        mock_record = MagicMock()
-        mock_record.keys.return_value = ["id"]
-        mock_record.__getitem__.side_effect = lambda key, idx=i: {"id": idx}[key]
-        mock_records.append(mock_record)
-    session.run.return_value = mock_records
+    query_result = mock_neo4j_driver.query_result
+    # Create records (under limit)
+    query_result.return_value = [
+        neo4j.Record({"id": i}) for i in range(TEST_QUERY_RESULT_COUNT_SMALL)
+    ]
 
     set_max_query_results(TEST_QUERY_RESULT_LIMIT_LARGE)
 
@@ -340,3 +659,43 @@ def test_execute_query_no_truncation_when_under_limit(mock_neo4j_driver):
     assert len(result["results"]) == TEST_QUERY_RESULT_COUNT_SMALL
     assert result["truncated"] is False
     assert result["summary"] is None
+
+
+@pytest.mark.parametrize(
+    "row_count,expected_truncated",
+    [(TEST_QUERY_RESULT_LIMIT, False), (TEST_QUERY_RESULT_LIMIT + 1, True)],
+)
+def test_execute_query_truncated_only_past_limit(
+    mock_neo4j_driver, reset_counter, row_count, expected_truncated
+):
+    mock_neo4j_driver.query_result.return_value = [
+        neo4j.Record({"id": i}) for i in range(row_count)
+    ]
+    set_max_query_results(TEST_QUERY_RESULT_LIMIT)
+
+    with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
+        result = execute_cypher_query("MATCH (n:User) RETURN n.id")
+
+    assert len(result["results"]) == TEST_QUERY_RESULT_LIMIT
+    assert result["truncated"] is expected_truncated
+    assert (result["summary"] is not None) is expected_truncated
+
+
+def test_execute_query_size_limiting(mock_neo4j_driver, reset_counter):
+    """Test that records stop being collected once the size limit is reached"""
+    query_result = mock_neo4j_driver.query_result
+    query_result.return_value = [
+        neo4j.Record({"id": i}) for i in range(TEST_QUERY_RESULT_COUNT_SMALL)
+    ]
+
+    # '[{"id":0},{"id":1},{"id":2}]' is 28 chars; a fourth record would not fit
+    set_max_tool_result_size(TEST_RESULT_SIZE_LIMIT)
+    try:
+        with patch("cypher_agent.tools._neo4j_driver", mock_neo4j_driver):
+            result = execute_cypher_query("MATCH (n:User) RETURN n.id LIMIT 10")
+    finally:
+        set_max_tool_result_size(TEST_DEFAULT_RESULT_SIZE_LIMIT)
+
+    assert result["results"] == [{"id": 0}, {"id": 1}, {"id": 2}]
+    assert result["truncated"] is True
+    assert "Result size: 28 chars" in result["summary"]